@@ -152,6 +152,11 @@ class ModeController:
         future.add_done_callback(lambda f: self._active_futures.discard(f))
         return future
 
+    def reload_config(self):
+        """Re-read mode settings from disk without resetting the current mode state."""
+        with self.mode_lock:
+            self.settings_manager.load_settings()
+
     def enforce_current_mode(self, window_info: WindowInfo):
         """Enforce the rules and restrictions of the current mode on the active window."""
         with self.mode_lock:
@@ -1,13 +1,37 @@
 # category_classifier.py
+import logging
 import re
 # Import the loaded categories from our new config manager
-from config_manager import CATEGORIES
+from config_manager import CATEGORIES, get_all_categories
 
 class CategoryClassifier:
     """Classifies window types based on rules loaded from an external config."""
     def __init__(self):
         # The patterns are now loaded directly from the config manager
         self.patterns = CATEGORIES
+        self._compiled = self._compile_patterns(self.patterns)
+
+    def reload_config(self):
+        """Re-read the category patterns from disk and recompile them."""
+        self.patterns = get_all_categories()
+        self._compiled = self._compile_patterns(self.patterns)
+
+    @staticmethod
+    def _compile_patterns(patterns: dict) -> list:
+        """Compile each category's patterns into one alternation, in category order."""
+        compiled = []
+        for window_type, category_patterns in patterns.items():
+            valid = []
+            for pattern in category_patterns:
+                try:
+                    re.compile(pattern)
+                except re.error as e:
+                    logging.warning(f"Skipping invalid pattern '{pattern}' in category '{window_type}': {e}")
+                    continue
+                valid.append(f"(?:{pattern})")
+            if valid:
+                compiled.append((window_type, re.compile("|".join(valid))))
+        return compiled
 
     def classify(self, title: str, process_name: str = "", class_name: str = "") -> str:
         """
@@ -20,11 +44,9 @@ class CategoryClassifier:
         
         title_lower = title.lower()
         process_lower = (process_name or "").lower()
-        for window_type, patterns in self.patterns.items():
-            for pattern in patterns:
-                if (re.search(pattern, title_lower) or
-                    re.search(pattern, process_lower) ):
-                    return window_type
+        for window_type, regex in self._compiled:
+            if regex.search(title_lower) or regex.search(process_lower):
+                return window_type
         
         return 'Not Calassified'
     
@@ -34,10 +56,9 @@ class CategoryClassifier:
         """
         app_lower = app_name.lower()
         if classified == 'browser':
-            for window_type, patterns in self.patterns.items():
-                for pattern in patterns:
-                    if (re.search(pattern, app_lower) ):
-                        return window_type
+            for window_type, regex in self._compiled:
+                if regex.search(app_lower):
+                    return window_type
             
         return classified
     
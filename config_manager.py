@@ -4,6 +4,7 @@ import logging
 import os
 import psutil
 import platform
+from functools import lru_cache
 from typing import Optional, List
 
 # --- Constants ---
@@ -72,6 +73,7 @@ def add_or_update_mapping(process_exe: str, friendly_name: str):
     current_map = load_process_map()
     current_map[process_exe] = friendly_name
     _save_json_config(PROCESS_MAP_FILE, current_map)
+    ensure_process_mapped.cache_clear()
     
 
 
@@ -109,6 +111,7 @@ def get_name(process_name):
            else [part.strip() for part in location.split("\\") if part.strip()][-3:-2][0]
        return [part.strip() for part in location.split("\\") if part.strip()][-2:-1][0] 
    
+@lru_cache(maxsize=256)
 def ensure_process_mapped(process_exe: str):
     """
     Checks if a process exists in the mapping, if not adds it with a default friendly name.
@@ -219,8 +222,10 @@ def last_url() -> dict:
 def get_domain():
     return last_url()["domain"]
 
-def processed_domain():
-    parts = parts = [part.strip() for part in get_domain().split(".") if part.strip()]
+def processed_domain(domain: Optional[str] = None):
+    if domain is None:
+        domain = get_domain()
+    parts = [part.strip() for part in domain.split(".") if part.strip()]
 
     if len(parts) == 1:
         return "browser"
@@ -276,4 +281,6 @@ def remove_prefix(prefix: str) -> bool:
 PROCESS_NAME_MAP = load_process_map()
 CATEGORIES = get_all_categories()
 URLS = get_all_urls()
-PREFIXES = get_all_prefixes()
\ No newline at end of file
+PREFIXES = get_all_prefixes()
+# Lowercased once so per-word prefix checks are a set lookup
+PREFIXES_SET = frozenset(prefix.lower() for prefix in PREFIXES)
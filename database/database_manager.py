@@ -6,6 +6,7 @@ from datetime import date, datetime, timedelta
 from typing import Optional, List, Dict, Any, Tuple
 from collections import defaultdict
 import logging
+import sys
 from .models import Base, WindowRecord, AppSessionDB, AppStatisticsDB
 from  models import WindowInfo , AppSession, AppStatistics
 # from layers.window_history import  
@@ -137,13 +138,16 @@ class DatabaseManager:
                 logging.error(f"Error saving app statistics: {e}")
                 raise
     
-    def get_recent_sessions(self, hours: int = 24) -> List[AppSession]:
-        """Get recent sessions from database"""
+    def get_recent_sessions(self, hours: int = 24, app_name: Optional[str] = None) -> List[AppSession]:
+        """Get recent sessions from database, optionally only for one app"""
         with self.get_session() as db_session:
             cutoff_time = datetime.now() - timedelta(hours=hours)
-            db_sessions = db_session.query(AppSessionDB).filter(
+            query = db_session.query(AppSessionDB).filter(
                 AppSessionDB.start_time >= cutoff_time
-            ).order_by(AppSessionDB.start_time).all()
+            )
+            if app_name:
+                query = query.filter_by(app_name=app_name)
+            db_sessions = query.order_by(AppSessionDB.start_time).all()
             
             return [self._convert_db_session_to_app_session(s) for s in db_sessions]
     
@@ -261,7 +265,8 @@ class DatabaseManager:
     def _convert_db_session_to_app_session(self, db_session: AppSessionDB) -> AppSession:
         """Convert database session to AppSession object"""
         return AppSession(
-            app_name=db_session.app_name,
+            # Interned so the many per-app dicts in analytics hit the identity fast path
+            app_name=sys.intern(db_session.app_name),
             start_time=db_session.start_time,
             end_time=db_session.end_time,
             total_duration=db_session.total_duration,
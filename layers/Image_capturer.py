@@ -13,6 +13,7 @@ class ImageCapturer:
         self.image_history = []
         self.interval = interval * 60
         self.is_capturing = False
+        self._stop_event = threading.Event()  # wakes the capture loop early on stop()
         self.lock = threading.Lock()
         self.base_folder = "screenshots"  # Base folder for all screenshots
         self.max_history_size = 100  # Maximum number of screenshots to keep in memory
@@ -44,6 +45,9 @@ class ImageCapturer:
             filename = timestamp.strftime("screenshot_%Y-%m-%d_%H-%M-%S.png")
             filepath = os.path.join(folder_path, filename)
             
+            # Pillow releases the GIL while it encodes the PNG, and a capture only runs
+            # once per `interval` minutes, so a thread is enough here; a separate
+            # process would add a second interpreter without freeing the tracker
             screenshot.save(filepath)  # Save with date-time filename in organized folders
             self.image_history.append((self.capture_time, screenshot, filepath))
             
@@ -51,7 +55,7 @@ class ImageCapturer:
             if len(self.image_history) > self.max_history_size:
                 self.image_history = self.image_history[-self.max_history_size:]
             
-            time.sleep(self.interval)
+            self._stop_event.wait(self.interval)
 
 
     def start(self):
@@ -61,12 +65,14 @@ class ImageCapturer:
             return
             
         self.is_capturing = True
+        self._stop_event.clear()
         self.tracking_thread = threading.Thread(target=self._capture_loop, daemon=True)
         self.tracking_thread.start()
         
     def stop(self):
         """Stops the image capturing."""
         self.is_capturing = False
+        self._stop_event.set()
         if hasattr(self, 'tracking_thread'):
             self.tracking_thread.join()
     
@@ -5,6 +5,7 @@ from typing import List, Dict, Optional, Tuple, Any
 from collections import defaultdict
 import threading
 import logging
+import sys
 
 from models import WindowInfo
 from ModeController.mode_controller import ModeController
@@ -32,6 +33,16 @@ class AppSession:
     def is_active(self) -> bool:
         """Check if this session is still active."""
         return self.end_time is None
+    
+    def effective_duration(self, now: Optional[datetime] = None) -> float:
+        """Return duration in seconds, measuring an active session up to `now`."""
+        if self.end_time is None:
+            return ((now or datetime.now()) - self.start_time).total_seconds()
+        return self.total_duration
+    
+    def effective_duration_minutes(self, now: Optional[datetime] = None) -> float:
+        """Return duration in minutes, measuring an active session up to `now`."""
+        return self.effective_duration(now) / 60.0
 
 @dataclass
 class AppStatistics:
@@ -78,6 +89,9 @@ class WindowHistory:
         self.last_window_time: Optional[datetime] = None
         self.last_app: Optional[str] = None
         
+        # Bumped whenever a session starts/ends or data is purged; lets readers invalidate caches
+        self._version = 0
+        
         # Mode controller for enforcing modes
         self.mode_controller = Mode_Controller
         self.tracker = tracker
@@ -183,17 +197,19 @@ class WindowHistory:
         self._update_app_statistics(self.current_session)
         
         self.current_session = None
+        self._version += 1
     
     def _start_new_session(self, window_info: WindowInfo, start_time: datetime):
         """Start a new session and save to database."""
         self.current_session = AppSession(
-            app_name=window_info.app,
+            app_name=sys.intern(window_info.app),
             start_time=start_time,
             context_changes=[window_info.context] if window_info.context else [],
             titles_seen=[window_info.raw_title],
             status_changes=[(start_time.isoformat(), window_info.status)],
             window_count=1
         )
+        self._version += 1
         
         # Save initial session to database
         try:
@@ -300,11 +316,19 @@ class WindowHistory:
     
     def get_recent_sessions(self, hours: int = 24) -> List[AppSession]:
         """Get sessions from database (with memory fallback)."""
+        return self._get_recent_sessions(hours)
+    
+    def get_recent_sessions_for_app(self, app_name: str, hours: int = 24) -> List[AppSession]:
+        """Get one app's recent sessions, filtered in the database query."""
+        return self._get_recent_sessions(hours, app_name)
+    
+    def _get_recent_sessions(self, hours: int, app_name: Optional[str] = None) -> List[AppSession]:
+        """Shared implementation of the recent-session queries."""
         try:
-            sessions = self.db_manager.get_recent_sessions(hours)
+            sessions = self.db_manager.get_recent_sessions(hours, app_name)
             
             # Add current session if it's recent and not in database results
-            if self.current_session:
+            if self.current_session and (app_name is None or self.current_session.app_name == app_name):
                 cutoff_time = datetime.now() - timedelta(hours=hours)
                 if self.current_session.start_time >= cutoff_time:
                     # Check if current session is already in results
@@ -320,7 +344,10 @@ class WindowHistory:
         except Exception as e:
             logging.error(f"Error getting recent sessions from database: {e}")
             # Fallback to memory-based method
-            return self._get_recent_sessions_memory(hours)
+            sessions = self._get_recent_sessions_memory(hours)
+            if app_name is not None:
+                sessions = [s for s in sessions if s.app_name == app_name]
+            return sessions
     
     def _get_recent_sessions_memory(self, hours: int = 24) -> List[AppSession]:
         """Fallback method using memory cache."""
@@ -492,20 +519,19 @@ class WindowHistory:
     
     def get_context_breakdown(self, app_name: str, hours: int = 24) -> Dict[str, float]:
         """Get context usage breakdown for a specific app from database."""
-        recent_sessions = self.get_recent_sessions(hours)
+        recent_sessions = self.get_recent_sessions_for_app(app_name, hours)
         context_times = defaultdict(float)
         
         for session in recent_sessions:
-            if session.app_name == app_name:
-                if session.context_changes:
-                    duration = session.total_duration
-                    if session.is_active:
-                        duration = (datetime.now() - session.start_time).total_seconds()
-                    
-                    time_per_context = duration / len(session.context_changes)
-                    for context in session.context_changes:
-                        if context:
-                            context_times[context] += time_per_context
+            if session.context_changes:
+                duration = session.total_duration
+                if session.is_active:
+                    duration = (datetime.now() - session.start_time).total_seconds()
+                
+                time_per_context = duration / len(session.context_changes)
+                for context in session.context_changes:
+                    if context:
+                        context_times[context] += time_per_context
         
         return dict(context_times)
     
@@ -600,36 +626,34 @@ class WindowHistory:
     
     def get_productive_apps_ranking(self, hours: int = 24) -> List[Tuple[str, float, float]]:
         """Get apps ranked by productivity from database."""
-        app_status_breakdown = self.get_status_by_app(hours)
-        app_rankings = []
-        
-        for app_name, status_times in app_status_breakdown.items():
-            productive_time = status_times.get('Productive', 0.0)
-            total_app_time = sum(status_times.values())
-            
-            productivity_ratio = productive_time / total_app_time if total_app_time > 0 else 0.0
-            
-            app_rankings.append((app_name, productive_time, productivity_ratio))
-        
-        # Sort by productive time (descending)
-        app_rankings.sort(key=lambda x: x[1], reverse=True)
-        
-        return app_rankings
+        return self._rank_apps_by_status(self.get_status_by_app(hours), 'Productive')
     
     def get_distracting_apps_ranking(self, hours: int = 24) -> List[Tuple[str, float, float]]:
         """Get apps ranked by distraction time from database."""
+        return self._rank_apps_by_status(self.get_status_by_app(hours), 'Distracting')
+    
+    def get_apps_rankings(self, hours: int = 24) -> Tuple[List[Tuple[str, float, float]], ...]:
+        """Get (productive, distracting, neutral) app rankings from a single database scan."""
         app_status_breakdown = self.get_status_by_app(hours)
+        return tuple(
+            self._rank_apps_by_status(app_status_breakdown, status)
+            for status in ('Productive', 'Distracting', 'Neutral')
+        )
+    
+    def _rank_apps_by_status(self, app_status_breakdown: Dict[str, Dict[str, float]],
+                             status: str) -> List[Tuple[str, float, float]]:
+        """Rank apps by time spent in `status` as (app_name, status_time, status_ratio)."""
         app_rankings = []
         
         for app_name, status_times in app_status_breakdown.items():
-            distracting_time = status_times.get('Distracting', 0.0)
+            status_time = status_times.get(status, 0.0)
             total_app_time = sum(status_times.values())
             
-            distraction_ratio = distracting_time / total_app_time if total_app_time > 0 else 0.0
+            status_ratio = status_time / total_app_time if total_app_time > 0 else 0.0
             
-            app_rankings.append((app_name, distracting_time, distraction_ratio))
+            app_rankings.append((app_name, status_time, status_ratio))
         
-        # Sort by distracting time (descending)
+        # Sort by status time (descending)
         app_rankings.sort(key=lambda x: x[1], reverse=True)
         
         return app_rankings
@@ -638,6 +662,7 @@ class WindowHistory:
         """Remove data older than specified days from database."""
         try:
             self.db_manager.cleanup_old_data(days)
+            self._version += 1
             # Refresh cache after cleanup
             self._load_recent_data_to_cache()
         except Exception as e:
@@ -2,7 +2,7 @@
 from dataclasses import dataclass, field
 from typing import Dict, Optional, Tuple , List
 from datetime import datetime
-@dataclass
+@dataclass(slots=True, frozen=True)
 class WindowInfo:
     """A data class to hold all information about a single window state."""
     raw_title: str
@@ -39,6 +39,18 @@ class WindowInfo:
     extra_info: Dict = field(default_factory=dict)
     
 
+@dataclass(slots=True)
+class ParsedTitle:
+    """The structured components parsed out of a raw window title."""
+    window_type: str = ""
+    app: str = ""
+    sub_app: str = ""
+    context: str = ""
+    display_title: str = ""
+    original_app: str = ""
+    domain: str = ""
+    
+
 @dataclass
 class AppSession:
     """Represents a continuous session of app usage."""
@@ -61,6 +73,16 @@ class AppSession:
     def is_active(self) -> bool:
         """Check if this session is still active."""
         return self.end_time is None
+    
+    def effective_duration(self, now: Optional[datetime] = None) -> float:
+        """Return duration in seconds, measuring an active session up to `now`."""
+        if self.end_time is None:
+            return ((now or datetime.now()) - self.start_time).total_seconds()
+        return self.total_duration
+    
+    def effective_duration_minutes(self, now: Optional[datetime] = None) -> float:
+        """Return duration in minutes, measuring an active session up to `now`."""
+        return self.effective_duration(now) / 60.0
 
 @dataclass
 class AppStatistics:
@@ -1,11 +1,129 @@
 # analytics.py
-from collections import defaultdict
-from typing import List, Dict, Any, Optional, Tuple
+from bisect import bisect_right
+from collections import Counter, OrderedDict, defaultdict
+from functools import wraps
+from io import StringIO
+from itertools import chain
+from operator import attrgetter, itemgetter
+from statistics import fmean
+from typing import List, Dict, Any, Iterator, Optional, TextIO, Tuple
 from datetime import datetime, timedelta
+import copy
+import csv
+import heapq
 import json
+import threading
+import time
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
 
 from layers.window_history import WindowHistory, AppSession, AppStatistics
 
+# Indexed by datetime.weekday(); avoids a locale-aware strftime("%A") per session
+_DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+
+# Upper bounds (minutes) of the focus buckets, in bucket order
+_FOCUS_BUCKET_BOUNDS = (5, 30, 60)
+_FOCUS_BUCKET_NAMES = ("short_focus", "medium_focus", "long_focus", "deep_focus")
+
+# Upper bounds (minutes) of the micro/brief/moderate attention buckets; deep is above the last
+_ATTENTION_BUCKET_BOUNDS = (2, 10, 30)
+
+# One C-level call per session instead of four attribute lookups in the aggregation loops
+_session_fields = attrgetter('app_name', 'start_time', 'total_duration', 'is_active')
+
+_ONE_MICROSECOND = timedelta(microseconds=1)
+_MULTITASK_WINDOW_SECONDS = 300
+
+# App-name substrings per category, checked in order; the first match wins.
+# This could be expanded with a more sophisticated categorization system
+_APP_CATEGORY_TERMS = (
+    ("Productivity", ("code", "terminal", "editor", "ide", "work", "office")),
+    ("Communication", ("slack", "teams", "zoom", "mail", "outlook")),
+    ("Web Browsing", ("chrome", "firefox", "safari", "edge")),
+    ("Entertainment", ("spotify", "youtube", "netflix", "games")),
+)
+_PRODUCTIVE_CATEGORIES = ("Productivity", "Communication")
+
+# Score adjustment applied for the latest status seen in a session
+_STATUS_PRODUCTIVITY_ADJUSTMENT = {"Productive": 30, "Distracting": -30}
+
+
+def _score_session_productivity(duration_minutes: float, context_change_count: int,
+                                window_count: int, latest_status: Optional[str]) -> float:
+    """Productivity score (0-100) of one session from its plain numeric features."""
+    score = 50  # Neutral baseline
+    
+    # Duration bonus (longer sessions generally more productive)
+    if duration_minutes > 30:
+        score += 20
+    elif duration_minutes > 15:
+        score += 10
+    elif duration_minutes < 5:
+        score -= 20
+    
+    # Context switching and window switching penalties
+    score -= context_change_count * 5
+    score -= (window_count - 1) * 2
+    
+    # Status-based adjustment (if available)
+    score += _STATUS_PRODUCTIVITY_ADJUSTMENT.get(latest_status, 0)
+    
+    return max(0, min(100, score))
+
+
+def _round_leaves(value: Any, ndigits: int = 2) -> Any:
+    """Round every float in a nested dict/list structure for display, leaving other values untouched."""
+    if isinstance(value, float):
+        return round(value, ndigits)
+    if isinstance(value, dict):
+        return {k: _round_leaves(v, ndigits) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_round_leaves(v, ndigits) for v in value)
+    return value
+
+
+def _ttl_cache(seconds: float = 30, maxsize: int = 16, copy_result: bool = True):
+    """
+    Cache a ModernAnalytics method per instance for `seconds`.
+    The key includes the history version, so a new or finished session invalidates it.
+    Callers get a deep copy of the cached report unless `copy_result` is False, which
+    is only safe for results that are already immutable.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())), getattr(self.history, '_version', None))
+            now = time.monotonic()
+            
+            with self._cache_lock:
+                cache = self._report_cache.setdefault(func.__name__, OrderedDict())
+                stats = self._cache_stats.setdefault(func.__name__, {"hits": 0, "misses": 0})
+                cached = cache.get(key)
+                if cached is not None and now - cached[0] < seconds:
+                    cache.move_to_end(key)
+                    stats["hits"] += 1
+                    result = cached[1]
+                    return copy.deepcopy(result) if copy_result else result
+                stats["misses"] += 1
+            
+            # Computed outside the lock; concurrent misses just store the same result twice
+            result = func(self, *args, **kwargs)
+            
+            with self._cache_lock:
+                cache[key] = (now, result)
+                cache.move_to_end(key)
+                while len(cache) > maxsize:
+                    cache.popitem(last=False)
+            return copy.deepcopy(result) if copy_result else result
+        return wrapper
+    return decorator
+
+
 class ModernAnalytics:
     """
     Advanced analytics system that leverages the WindowHistory class
@@ -14,18 +132,31 @@ class ModernAnalytics:
     
     def __init__(self, window_history: WindowHistory):
         self.history = window_history
+        self._report_cache: Dict[str, OrderedDict] = {}
+        self._cache_stats: Dict[str, Dict[str, int]] = {}
+        self._cache_lock = threading.Lock()
+    
+    def get_cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Get hit/miss counters of the cached analytics methods."""
+        with self._cache_lock:
+            return {name: dict(stats) for name, stats in self._cache_stats.items()}
+    
+    @_ttl_cache(seconds=30, maxsize=16, copy_result=False)
+    def _get_recent_sessions(self, hours: int) -> Tuple[AppSession, ...]:
+        """Recent sessions shared by the analytics methods, as a tuple so no caller can alter them."""
+        return tuple(self.history.get_recent_sessions(hours))
     
     # ========== SESSION-BASED ANALYTICS ==========
     
     def get_session_insights(self, hours: int = 24) -> Dict[str, Any]:
         """Get comprehensive session-based insights."""
-        sessions = self.history.get_recent_sessions(hours)
+        sessions = self._get_recent_sessions(hours)
         
         if not sessions:
             return {"error": "No sessions found in the specified time period"}
         
         total_sessions = len(sessions)
-        active_sessions = sum(1 for s in sessions if s.is_active)
+        active_sessions = sum(s.is_active for s in sessions)
         completed_sessions = total_sessions - active_sessions
         
         # Session duration statistics
@@ -55,41 +186,35 @@ class ModernAnalytics:
     
     def get_focus_patterns(self, hours: int = 24) -> Dict[str, Any]:
         """Analyze focus and attention patterns."""
-        sessions = self.history.get_recent_sessions(hours)
-        
-        # Focus duration analysis
-        focus_buckets = {
-            "short_focus": 0,    # < 5 minutes
-            "medium_focus": 0,   # 5-30 minutes
-            "long_focus": 0,     # 30+ minutes
-            "deep_focus": 0      # 60+ minutes
-        }
+        sessions = self._get_recent_sessions(hours)
+        
+        # Focus duration analysis: short < 5, medium 5-30, long 30-60, deep 60+ minutes
+        bucket_counts = [0] * len(_FOCUS_BUCKET_NAMES)
         
         total_focus_time = 0
-        focus_sessions = []
+        durations = []
         
+        now = datetime.now()
         for session in sessions:
-            if session.is_active:
-                duration = (datetime.now() - session.start_time).total_seconds() / 60
-            else:
-                duration = session.duration_minutes
+            duration = session.effective_duration_minutes(now)
             
             total_focus_time += duration
-            focus_sessions.append({
+            durations.append(duration)
+            
+            bucket_counts[bisect_right(_FOCUS_BUCKET_BOUNDS, duration)] += 1
+        
+        focus_buckets = dict(zip(_FOCUS_BUCKET_NAMES, bucket_counts))
+        
+        # Only the sessions actually returned get a detail dict
+        focus_sessions = [
+            {
                 "app": session.app_name,
                 "duration_minutes": round(duration, 2),
                 "context_changes": len(session.context_changes),
                 "window_count": session.window_count
-            })
-            
-            if duration < 5:
-                focus_buckets["short_focus"] += 1
-            elif duration < 30:
-                focus_buckets["medium_focus"] += 1
-            elif duration < 60:
-                focus_buckets["long_focus"] += 1
-            else:
-                focus_buckets["deep_focus"] += 1
+            }
+            for session, duration in zip(sessions[:10], durations)
+        ]
         
         # Calculate focus quality metrics
         avg_context_changes = sum(len(s.context_changes) for s in sessions) / len(sessions) if sessions else 0
@@ -99,7 +224,7 @@ class ModernAnalytics:
             "total_focus_time_minutes": round(total_focus_time, 2),
             "average_context_changes_per_session": round(avg_context_changes, 2),
             "focus_quality_score": self._calculate_focus_quality_score(sessions),
-            "detailed_sessions": focus_sessions[:10]  # Top 10 recent sessions
+            "detailed_sessions": focus_sessions  # Top 10 recent sessions
         }
     
     # ========== PRODUCTIVITY ANALYTICS ==========
@@ -109,9 +234,8 @@ class ModernAnalytics:
         status_summary = self.history.get_status_summary_by_period(period, offset)
         sessions = self.history.get_sessions_by_period(period, offset)
         
-        # Productivity trends
-        productive_apps = self.history.get_productive_apps_ranking(24 if period == 'day' else 168)
-        distracting_apps = self.history.get_distracting_apps_ranking(24 if period == 'day' else 168)
+        # Productivity trends (both rankings come from one status-by-app scan)
+        productive_apps, distracting_apps, _ = self.history.get_apps_rankings(24 if period == 'day' else 168)
         
         # Time allocation analysis
         time_allocation = self._analyze_time_allocation(sessions)
@@ -130,6 +254,7 @@ class ModernAnalytics:
             "recommendations": self._generate_productivity_recommendations(status_summary, sessions)
         }
     
+    @_ttl_cache(seconds=30, maxsize=16)
     def get_productivity_trends(self, days: int = 7) -> Dict[str, Any]:
         """Analyze productivity trends over multiple days."""
         daily_summaries = self.history.get_daily_summary_range(days)
@@ -168,20 +293,19 @@ class ModernAnalytics:
     
     # ========== BEHAVIORAL ANALYTICS ==========
     
+    @_ttl_cache(seconds=30, maxsize=16)
     def get_behavioral_patterns(self, hours: int = 168) -> Dict[str, Any]:  # Default: 1 week
         """Analyze behavioral patterns and habits."""
-        sessions = self.history.get_recent_sessions(hours)
+        sessions = self._get_recent_sessions(hours)
         
         # Time-of-day patterns
         hourly_usage = defaultdict(float)
-        app_usage_by_hour = defaultdict(lambda: defaultdict(float))
         
-        for session in sessions:
-            hour = session.start_time.hour
-            duration = session.total_duration if not session.is_active else (datetime.now() - session.start_time).total_seconds()
+        now = datetime.now()
+        for _, start_time, total_duration, is_active in map(_session_fields, sessions):
+            duration = total_duration if not is_active else (now - start_time).total_seconds()
             
-            hourly_usage[hour] += duration / 3600  # Convert to hours
-            app_usage_by_hour[hour][session.app_name] += duration / 3600
+            hourly_usage[start_time.hour] += duration / 3600  # Convert to hours
         
         # Day-of-week patterns
         daily_patterns = self._analyze_daily_patterns(sessions)
@@ -203,7 +327,7 @@ class ModernAnalytics:
     
     def get_app_deep_dive(self, app_name: str, hours: int = 168) -> Dict[str, Any]:
         """Get detailed analysis for a specific application."""
-        sessions = [s for s in self.history.get_recent_sessions(hours) if s.app_name == app_name]
+        sessions = self.history.get_recent_sessions_for_app(app_name, hours)
         app_stats = self.history.get_app_statistics(app_name).get(app_name)
         
         if not sessions:
@@ -271,6 +395,7 @@ class ModernAnalytics:
     
     # ========== EXPORT AND REPORTING ==========
     
+    @_ttl_cache(seconds=30, maxsize=16)
     def generate_comprehensive_report(self, period: str = 'week', offset: int = 0) -> Dict[str, Any]:
         """Generate a comprehensive analytics report."""
         report = {
@@ -309,6 +434,13 @@ class ModernAnalytics:
         data = self.generate_comprehensive_report(period, offset)
         
         if format.lower() == 'json':
+            if HAS_ORJSON:
+                # Datetimes go through default=str as in the json fallback, so the export
+                # format doesn't depend on whether orjson is installed
+                return orjson.dumps(
+                    data, default=str,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                ).decode('utf-8')
             return json.dumps(data, indent=2, default=str)
         elif format.lower() == 'csv':
             return self._convert_to_csv(data)
@@ -340,32 +472,28 @@ class ModernAnalytics:
         """Get top apps by usage time from sessions."""
         app_times = defaultdict(float)
         
-        for session in sessions:
-            duration = session.total_duration
-            if session.is_active:
-                duration = (datetime.now() - session.start_time).total_seconds()
-            app_times[session.app_name] += duration
+        now = datetime.now()
+        for app_name, start_time, duration, is_active in map(_session_fields, sessions):
+            if is_active:
+                duration = (now - start_time).total_seconds()
+            app_times[app_name] += duration
         
-        sorted_apps = sorted(app_times.items(), key=lambda x: x[1], reverse=True)
+        top_apps = heapq.nlargest(n, app_times.items(), key=itemgetter(1))
         
         return [
             {"app": app, "time_seconds": time, "time_hours": round(time / 3600, 2)}
-            for app, time in sorted_apps[:n]
+            for app, time in top_apps
         ]
     
     def _calculate_context_diversity(self, sessions: List[AppSession]) -> Dict[str, Any]:
         """Calculate context diversity metrics."""
-        all_contexts = set()
-        context_changes_per_session = []
-        
-        for session in sessions:
-            all_contexts.update(session.context_changes)
-            context_changes_per_session.append(len(session.context_changes))
+        context_lists = [s.context_changes for s in sessions]
+        all_contexts = set(chain.from_iterable(context_lists))
         
         return {
             "unique_contexts": len(all_contexts),
             "contexts": list(all_contexts),
-            "average_contexts_per_session": sum(context_changes_per_session) / len(context_changes_per_session) if context_changes_per_session else 0
+            "average_contexts_per_session": sum(map(len, context_lists)) / len(context_lists) if context_lists else 0
         }
     
     def _calculate_focus_quality_score(self, sessions: List[AppSession]) -> float:
@@ -374,8 +502,9 @@ class ModernAnalytics:
             return 0.0
         
         total_score = 0
+        now = datetime.now()
         for session in sessions:
-            duration_minutes = session.duration_minutes if not session.is_active else (datetime.now() - session.start_time).total_seconds() / 60
+            duration_minutes = session.effective_duration_minutes(now)
             
             # Longer sessions get higher base score
             duration_score = min(duration_minutes / 30, 1.0)  # Cap at 30 minutes
@@ -417,16 +546,17 @@ class ModernAnalytics:
         app_categories = self._categorize_apps([s.app_name for s in sessions])
         
         category_times = defaultdict(float)
-        for session in sessions:
-            category = app_categories.get(session.app_name, "Other")
-            duration = session.total_duration if not session.is_active else (datetime.now() - session.start_time).total_seconds()
+        now = datetime.now()
+        for app_name, start_time, total_duration, is_active in map(_session_fields, sessions):
+            category = app_categories.get(app_name, "Other")
+            duration = total_duration if not is_active else (now - start_time).total_seconds()
             category_times[category] += duration
         
         # Convert to percentages
-        category_percentages = {
-            category: round((time / total_time) * 100, 2)
+        category_percentages = _round_leaves({
+            category: (time / total_time) * 100
             for category, time in category_times.items()
-        }
+        })
         
         return {
             "total_time_hours": round(total_time / 3600, 2),
@@ -436,33 +566,20 @@ class ModernAnalytics:
     
     def _categorize_apps(self, app_names: List[str]) -> Dict[str, str]:
         """Categorize apps into productivity categories."""
-        # This could be expanded with a more sophisticated categorization system
-        productivity_apps = {"code", "terminal", "editor", "ide", "work", "office"}
-        communication_apps = {"slack", "teams", "zoom", "mail", "outlook"}
-        browser_apps = {"chrome", "firefox", "safari", "edge"}
-        entertainment_apps = {"spotify", "youtube", "netflix", "games"}
-        
         categories = {}
         for app in set(app_names):
             app_lower = app.lower()
-            
-            if any(term in app_lower for term in productivity_apps):
-                categories[app] = "Productivity"
-            elif any(term in app_lower for term in communication_apps):
-                categories[app] = "Communication"
-            elif any(term in app_lower for term in browser_apps):
-                categories[app] = "Web Browsing"
-            elif any(term in app_lower for term in entertainment_apps):
-                categories[app] = "Entertainment"
-            else:
-                categories[app] = "Other"
+            categories[app] = next(
+                (category for category, terms in _APP_CATEGORY_TERMS
+                 if any(term in app_lower for term in terms)),
+                "Other"
+            )
         
         return categories
     
     def _calculate_time_efficiency(self, category_percentages: Dict[str, float]) -> float:
         """Calculate time efficiency score based on category allocation."""
-        productive_categories = ["Productivity", "Communication"]
-        efficiency_score = sum(category_percentages.get(cat, 0) for cat in productive_categories)
+        efficiency_score = sum(category_percentages.get(cat, 0) for cat in _PRODUCTIVE_CATEGORIES)
         
         return round(efficiency_score, 2)
     
@@ -481,7 +598,7 @@ class ModernAnalytics:
             recommendations.append("Try to increase productive app usage - currently below 40% of total time")
         
         # Analyze session lengths
-        short_sessions = sum(1 for s in sessions if s.duration_minutes < 15)
+        short_sessions = sum(s.duration_minutes < 15 for s in sessions)
         if short_sessions > len(sessions) * 0.6:
             recommendations.append("Many sessions are under 15 minutes - consider longer focus blocks")
         
@@ -510,16 +627,17 @@ class ModernAnalytics:
     
     def _find_peak_hours(self, hourly_usage: Dict[int, float]) -> List[int]:
         """Find peak usage hours."""
-        sorted_hours = sorted(hourly_usage.items(), key=lambda x: x[1], reverse=True)
-        return [hour for hour, _ in sorted_hours[:3]]  # Top 3 hours
+        top_hours = heapq.nlargest(3, hourly_usage.items(), key=itemgetter(1))
+        return [hour for hour, _ in top_hours]  # Top 3 hours
     
     def _analyze_daily_patterns(self, sessions: List[AppSession]) -> Dict[str, Any]:
         """Analyze patterns by day of week."""
         daily_usage = defaultdict(float)
         
-        for session in sessions:
-            day_name = session.start_time.strftime("%A")
-            duration = session.total_duration if not session.is_active else (datetime.now() - session.start_time).total_seconds()
+        now = datetime.now()
+        for _, start_time, total_duration, is_active in map(_session_fields, sessions):
+            day_name = _DAY_NAMES[start_time.weekday()]
+            duration = total_duration if not is_active else (now - start_time).total_seconds()
             daily_usage[day_name] += duration / 3600  # Convert to hours
         
         return dict(daily_usage)
@@ -592,7 +710,7 @@ class ModernAnalytics:
         
         for session in sessions:
             hourly_usage[session.start_time.hour] += 1
-            daily_usage[session.start_time.strftime("%A")] += 1
+            daily_usage[_DAY_NAMES[session.start_time.weekday()]] += 1
         
         return {
             "preferred_hours": dict(hourly_usage),
@@ -640,12 +758,13 @@ class ModernAnalytics:
         if not daily_summaries:
             return {}
         
-        best_day = max(daily_summaries, key=lambda x: self._calculate_productivity_score(x))
+        scored = [(self._calculate_productivity_score(day), day) for day in daily_summaries]
+        best_score, best_day = max(scored, key=itemgetter(0))
         
         return {
             "date": best_day.get("date"),
             "day_name": best_day.get("day_name"),
-            "productivity_score": self._calculate_productivity_score(best_day),
+            "productivity_score": best_score,
             "productive_time_hours": best_day["times"].get("Productive", 0) / 3600
         }
     
@@ -672,53 +791,55 @@ class ModernAnalytics:
     
     def _convert_to_csv(self, data: Dict[str, Any]) -> str:
         """Convert analytics data to CSV format."""
-        import csv
-        from io import StringIO
-        
         output = StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['Metric', 'Value', 'Category'])
+        self._write_csv(data, output)
+        return output.getvalue()
+    
+    def _write_csv(self, data: Dict[str, Any], fp: TextIO):
+        """Write analytics data as CSV rows directly to a text file-like object."""
+        csv.writer(fp).writerows(self._iter_csv_rows(data))
+    
+    def _iter_csv_rows(self, data: Dict[str, Any]) -> Iterator[List[Any]]:
+        """Lazily yield the CSV rows (header first) for analytics data."""
+        yield ['Metric', 'Value', 'Category']
         
         # Summary data
         if 'summary' in data:
             summary = data['summary']
-            writer.writerow(['Total Sessions', summary.get('total_sessions', 0), 'Summary'])
-            writer.writerow(['Active Sessions', summary.get('active_sessions', 0), 'Summary'])
-            writer.writerow(['Average Session Duration (min)', summary.get('average_session_duration_minutes', 0), 'Summary'])
+            yield ['Total Sessions', summary.get('total_sessions', 0), 'Summary']
+            yield ['Active Sessions', summary.get('active_sessions', 0), 'Summary']
+            yield ['Average Session Duration (min)', summary.get('average_session_duration_minutes', 0), 'Summary']
         
         # Productivity data
         if 'productivity' in data and 'status_breakdown' in data['productivity']:
             status = data['productivity']['status_breakdown']
             if 'times' in status:
                 for status_type, time_seconds in status['times'].items():
-                    writer.writerow([f'{status_type} Time (hours)', round(time_seconds / 3600, 2), 'Productivity'])
+                    yield [f'{status_type} Time (hours)', round(time_seconds / 3600, 2), 'Productivity']
             
             if 'percentages' in status:
                 for status_type, percentage in status['percentages'].items():
-                    writer.writerow([f'{status_type} Percentage', f'{percentage}%', 'Productivity'])
+                    yield [f'{status_type} Percentage', f'{percentage}%', 'Productivity']
         
         # Focus data
         if 'focus' in data:
             focus = data['focus']
-            writer.writerow(['Focus Quality Score', focus.get('focus_quality_score', 0), 'Focus'])
-            writer.writerow(['Total Focus Time (min)', focus.get('total_focus_time_minutes', 0), 'Focus'])
-        
-        return output.getvalue()
+            yield ['Focus Quality Score', focus.get('focus_quality_score', 0), 'Focus']
+            yield ['Total Focus Time (min)', focus.get('total_focus_time_minutes', 0), 'Focus']
 
     # ========== ADVANCED ANALYTICS METHODS ==========
     
     def get_interruption_analysis(self, hours: int = 24) -> Dict[str, Any]:
         """Analyze interruption patterns and their impact on productivity."""
-        sessions = self.history.get_recent_sessions(hours)
+        sessions = self._get_recent_sessions(hours)
         
         interruptions = []
         total_sessions = len(sessions)
         short_sessions = 0  # Sessions under 5 minutes (likely interruptions)
         
+        now = datetime.now()
         for i, session in enumerate(sessions):
-            duration_minutes = session.duration_minutes if not session.is_active else (datetime.now() - session.start_time).total_seconds() / 60
+            duration_minutes = session.effective_duration_minutes(now)
             
             if duration_minutes < 5:
                 short_sessions += 1
@@ -733,9 +854,13 @@ class ModernAnalytics:
                         'from_app': prev_session.app_name,
                         'to_app': session.app_name,
                         'gap_seconds': time_gap,
-                        'timestamp': session.start_time.isoformat()
+                        'timestamp': session.start_time  # Formatted below, only for the entries returned
                     })
         
+        interruption_timeline = interruptions[-10:]  # Last 10 interruptions
+        for interruption in interruption_timeline:
+            interruption['timestamp'] = interruption['timestamp'].isoformat()
+        
         interruption_rate = len(interruptions) / total_sessions if total_sessions > 0 else 0
         
         return {
@@ -744,13 +869,13 @@ class ModernAnalytics:
             'short_sessions_count': short_sessions,
             'short_sessions_percentage': round((short_sessions / total_sessions) * 100, 2) if total_sessions > 0 else 0,
             'most_disruptive_apps': self._find_disruptive_apps(interruptions),
-            'interruption_timeline': interruptions[-10:],  # Last 10 interruptions
+            'interruption_timeline': interruption_timeline,
             'recommendations': self._generate_interruption_recommendations(interruption_rate, short_sessions, total_sessions)
         }
     
     def get_cognitive_load_analysis(self, hours: int = 24) -> Dict[str, Any]:
         """Analyze cognitive load based on app switching and multitasking patterns."""
-        sessions = self.history.get_recent_sessions(hours)
+        sessions = self._get_recent_sessions(hours)
         
         if not sessions:
             return {"error": "No sessions found"}
@@ -765,6 +890,11 @@ class ModernAnalytics:
         # Multitasking detection (multiple apps within short time windows)
         multitasking_periods = self._detect_multitasking_periods(sessions)
         
+        # Top 5 most intensive periods; only these need an ISO timestamp
+        peak_load_periods = heapq.nlargest(5, multitasking_periods, key=itemgetter('intensity'))
+        for period in peak_load_periods:
+            period['start_time'] = period['start_time'].isoformat()
+        
         # Cognitive load score (0-100, higher = more load)
         if total_time > 0:
             switch_rate = (total_switches / total_time) * 3600  # switches per hour
@@ -780,13 +910,13 @@ class ModernAnalytics:
             'context_switches_per_hour': round((context_switches / total_time) * 3600, 2) if total_time > 0 else 0,
             'multitasking_periods': len(multitasking_periods),
             'load_category': self._categorize_cognitive_load(cognitive_load_score),
-            'peak_load_periods': multitasking_periods[:5],  # Top 5 most intensive periods
+            'peak_load_periods': peak_load_periods,
             'recommendations': self._generate_cognitive_load_recommendations(cognitive_load_score)
         }
     
     def get_attention_span_analysis(self, hours: int = 168) -> Dict[str, Any]:
         """Analyze attention span patterns and trends."""
-        sessions = self.history.get_recent_sessions(hours)
+        sessions = self._get_recent_sessions(hours)
         
         if not sessions:
             return {"error": "No sessions found"}
@@ -794,8 +924,9 @@ class ModernAnalytics:
         # Group sessions by app to analyze attention spans
         app_attention_spans = defaultdict(list)
         
+        now = datetime.now()
         for session in sessions:
-            duration_minutes = session.duration_minutes if not session.is_active else (datetime.now() - session.start_time).total_seconds() / 60
+            duration_minutes = session.effective_duration_minutes(now)
             app_attention_spans[session.app_name].append(duration_minutes)
         
         # Calculate attention span metrics
@@ -804,21 +935,37 @@ class ModernAnalytics:
         
         for app, spans in app_attention_spans.items():
             overall_spans.extend(spans)
+            
+            # Mean is computed once and reused for the (population) standard deviation
+            span_count = len(spans)
+            mean_span = sum(spans) / span_count
+            if span_count > 1 and mean_span > 0:
+                std_span = (sum((span - mean_span) ** 2 for span in spans) / span_count) ** 0.5
+                span_consistency = 1 - (std_span / mean_span)
+            else:
+                span_consistency = 0
+            
             attention_metrics[app] = {
-                'average_span': round(sum(spans) / len(spans), 2),
-                'max_span': round(max(spans), 2),
-                'min_span': round(min(spans), 2),
-                'span_consistency': round(1 - (np.std(spans) / np.mean(spans)), 2) if len(spans) > 1 and np.mean(spans) > 0 else 0
+                'average_span': mean_span,
+                'max_span': max(spans),
+                'min_span': min(spans),
+                'span_consistency': span_consistency
             }
+        attention_metrics = _round_leaves(attention_metrics)
         
         # Overall attention metrics
         if overall_spans:
             avg_attention_span = sum(overall_spans) / len(overall_spans)
+            # One pass: micro < 2, brief 2-10, moderate 10-30, deep 30+ minutes
+            bucket_counts = [0] * (len(_ATTENTION_BUCKET_BOUNDS) + 1)
+            for span in overall_spans:
+                bucket_counts[bisect_right(_ATTENTION_BUCKET_BOUNDS, span)] += 1
+            micro, brief, moderate, deep = bucket_counts
             attention_categories = {
-                'deep_focus': sum(1 for span in overall_spans if span >= 30),  # 30+ minutes
-                'moderate_focus': sum(1 for span in overall_spans if 10 <= span < 30),  # 10-30 minutes
-                'brief_focus': sum(1 for span in overall_spans if 2 <= span < 10),  # 2-10 minutes
-                'micro_focus': sum(1 for span in overall_spans if span < 2)  # <2 minutes
+                'deep_focus': deep,
+                'moderate_focus': moderate,
+                'brief_focus': brief,
+                'micro_focus': micro
             }
         else:
             avg_attention_span = 0
@@ -836,33 +983,33 @@ class ModernAnalytics:
     
     def get_energy_pattern_analysis(self, days: int = 14) -> Dict[str, Any]:
         """Analyze energy and productivity patterns throughout the day over multiple days."""
-        sessions = self.history.get_recent_sessions(days * 24)
+        sessions = self._get_recent_sessions(days * 24)
         
         if not sessions:
             return {"error": "No sessions found"}
         
-        # Group sessions by hour of day
-        hourly_productivity = defaultdict(list)
-        hourly_focus_duration = defaultdict(list)
+        # Per-hour-of-day running totals; no per-hour lists are kept
+        productivity_sums = [0] * 24
+        duration_sums = [0] * 24
+        session_counts = [0] * 24
         
+        now = datetime.now()
         for session in sessions:
             hour = session.start_time.hour
-            duration_minutes = session.duration_minutes if not session.is_active else (datetime.now() - session.start_time).total_seconds() / 60
             
             # Estimate productivity based on status changes and duration
-            productivity_score = self._estimate_session_productivity(session)
-            
-            hourly_productivity[hour].append(productivity_score)
-            hourly_focus_duration[hour].append(duration_minutes)
+            productivity_sums[hour] += self._estimate_session_productivity(session, now)
+            duration_sums[hour] += session.effective_duration_minutes(now)
+            session_counts[hour] += 1
         
         # Calculate average metrics for each hour
         energy_pattern = {}
-        for hour in range(24):
-            if hourly_productivity[hour]:
+        for hour, count in enumerate(session_counts):
+            if count:
                 energy_pattern[hour] = {
-                    'avg_productivity': round(sum(hourly_productivity[hour]) / len(hourly_productivity[hour]), 2),
-                    'avg_focus_duration': round(sum(hourly_focus_duration[hour]) / len(hourly_focus_duration[hour]), 2),
-                    'session_count': len(hourly_productivity[hour])
+                    'avg_productivity': productivity_sums[hour] / count,
+                    'avg_focus_duration': duration_sums[hour] / count,
+                    'session_count': count
                 }
             else:
                 energy_pattern[hour] = {
@@ -870,10 +1017,11 @@ class ModernAnalytics:
                     'avg_focus_duration': 0,
                     'session_count': 0
                 }
+        energy_pattern = _round_leaves(energy_pattern)
         
         # Identify peak energy periods
-        peak_hours = sorted(energy_pattern.items(), key=lambda x: x[1]['avg_productivity'], reverse=True)[:3]
-        low_energy_hours = sorted(energy_pattern.items(), key=lambda x: x[1]['avg_productivity'])[:3]
+        peak_hours = heapq.nlargest(3, energy_pattern.items(), key=lambda x: x[1]['avg_productivity'])
+        low_energy_hours = heapq.nsmallest(3, energy_pattern.items(), key=lambda x: x[1]['avg_productivity'])
         
         return {
             'hourly_energy_pattern': energy_pattern,
@@ -886,7 +1034,7 @@ class ModernAnalytics:
     
     def get_workflow_efficiency_analysis(self, hours: int = 24) -> Dict[str, Any]:
         """Analyze workflow efficiency and identify bottlenecks."""
-        sessions = self.history.get_recent_sessions(hours)
+        sessions = self._get_recent_sessions(hours)
         
         if not sessions:
             return {"error": "No sessions found"}
@@ -908,12 +1056,13 @@ class ModernAnalytics:
             })
         
         # Find common workflows
-        workflow_patterns = self._identify_workflow_patterns(transitions)
+        workflow_patterns = self._identify_workflow_patterns(transitions, limit=5)
         
         # Calculate efficiency metrics
-        avg_transition_time = sum(t['transition_time'] for t in transitions) / len(transitions) if transitions else 0
-        quick_transitions = sum(1 for t in transitions if t['transition_time'] < 5)  # Under 5 seconds
-        slow_transitions = sum(1 for t in transitions if t['transition_time'] > 60)  # Over 1 minute
+        transition_times = [t['transition_time'] for t in transitions]
+        avg_transition_time = fmean(transition_times) if transition_times else 0
+        quick_transitions = sum(t < 5 for t in transition_times)  # Under 5 seconds
+        slow_transitions = sum(t > 60 for t in transition_times)  # Over 1 minute
         
         # Identify inefficient patterns
         inefficient_patterns = self._find_inefficient_patterns(transitions)
@@ -924,23 +1073,20 @@ class ModernAnalytics:
             'quick_transitions': quick_transitions,
             'slow_transitions': slow_transitions,
             'transition_efficiency': round((quick_transitions / len(transitions)) * 100, 2) if transitions else 0,
-            'common_workflows': workflow_patterns[:5],
+            'common_workflows': workflow_patterns,
             'inefficient_patterns': inefficient_patterns[:3],
-            'workflow_recommendations': self._generate_workflow_recommendations(transitions, inefficient_patterns)
+            'workflow_recommendations': self._generate_workflow_recommendations(transitions, inefficient_patterns, avg_transition_time)
         }
     
     # ========== HELPER METHODS FOR ADVANCED ANALYTICS ==========
     
     def _find_disruptive_apps(self, interruptions: List[Dict]) -> List[Dict[str, Any]]:
         """Find apps that cause the most interruptions."""
-        app_disruptions = defaultdict(int)
-        
-        for interruption in interruptions:
-            app_disruptions[interruption['to_app']] += 1
+        app_disruptions = Counter(map(itemgetter('to_app'), interruptions))
         
-        sorted_apps = sorted(app_disruptions.items(), key=lambda x: x[1], reverse=True)
+        top_apps = heapq.nlargest(5, app_disruptions.items(), key=itemgetter(1))
         
-        return [{'app': app, 'interruptions': count} for app, count in sorted_apps[:5]]
+        return [{'app': app, 'interruptions': count} for app, count in top_apps]
     
     def _generate_interruption_recommendations(self, interruption_rate: float, short_sessions: int, total_sessions: int) -> List[str]:
         """Generate recommendations for reducing interruptions."""
@@ -949,7 +1095,8 @@ class ModernAnalytics:
         if interruption_rate > 0.3:
             recommendations.append("⚠️ High interruption rate detected - consider using focus modes or app blockers")
         
-        if short_sessions / total_sessions > 0.4 if total_sessions > 0 else False:
+        short_session_ratio = short_sessions / total_sessions if total_sessions > 0 else 0.0
+        if short_session_ratio > 0.4:
             recommendations.append("🎯 Many sessions are very short - try batching similar tasks together")
         
         if interruption_rate > 0.1:
@@ -958,29 +1105,52 @@ class ModernAnalytics:
         return recommendations
     
     def _detect_multitasking_periods(self, sessions: List[AppSession]) -> List[Dict[str, Any]]:
-        """Detect periods of intensive multitasking."""
+        """Detect periods of intensive multitasking, in chronological order (start_time is a datetime)."""
         multitasking_periods = []
-        
-        # Look for periods with rapid app switching
+        if not sessions:
+            return multitasking_periods
+        
+        # Integer microsecond offsets, computed once, so the window scan compares ints
+        # instead of allocating a timedelta per comparison
+        origin = sessions[0].start_time
+        offsets = [(s.start_time - origin) // _ONE_MICROSECOND for s in sessions]
+        window_us = _MULTITASK_WINDOW_SECONDS * 1_000_000
+        
+        # Small integer ids per app, so window membership is a flat list of counters
+        app_index: Dict[str, int] = {}
+        app_ids = [app_index.setdefault(s.app_name, len(app_index)) for s in sessions]
+        app_names = list(app_index)
+        
+        # Two-pointer sweep over the (start-sorted) sessions: the window [i, j) covers the
+        # 5 minutes after session i, and j only ever moves forward. in_window[k] counts the
+        # sessions of app k inside the window; distinct is the number of non-zero counters.
+        in_window = [0] * len(app_names)
+        distinct = 0
+        j = 0
         for i in range(len(sessions) - 2):  # Need at least 3 sessions to detect pattern
-            current_time = sessions[i].start_time
-            apps_in_window = set()
+            # Binary-search the new window end, starting from where the last one stopped
+            window_end = bisect_right(offsets, offsets[i] + window_us, j)
+            for app_id in app_ids[j:window_end]:
+                if not in_window[app_id]:
+                    distinct += 1
+                in_window[app_id] += 1
+            j = window_end
             
-            # Look at next 5 minutes
-            j = i
-            while j < len(sessions) and (sessions[j].start_time - current_time).total_seconds() <= 300:
-                apps_in_window.add(sessions[j].app_name)
-                j += 1
-            
-            if len(apps_in_window) >= 3:  # 3+ different apps in 5 minutes
+            if distinct >= 3:  # 3+ different apps in 5 minutes
                 multitasking_periods.append({
-                    'start_time': current_time.isoformat(),
-                    'apps_count': len(apps_in_window),
-                    'apps': list(apps_in_window),
-                    'intensity': len(apps_in_window) / 5  # apps per minute
+                    'start_time': sessions[i].start_time,
+                    'apps_count': distinct,
+                    'apps': [app_names[k] for k in set(app_ids[i:j])],
+                    'intensity': distinct / 5  # apps per minute
                 })
+            
+            # Session i leaves the window before the next start is considered
+            app_id = app_ids[i]
+            in_window[app_id] -= 1
+            if not in_window[app_id]:
+                distinct -= 1
         
-        return sorted(multitasking_periods, key=lambda x: x['intensity'], reverse=True)
+        return multitasking_periods
     
     def _categorize_cognitive_load(self, score: float) -> str:
         """Categorize cognitive load score."""
@@ -1022,7 +1192,7 @@ class ModernAnalytics:
                 'consistency': metrics['span_consistency']
             })
         
-        return sorted(focus_scores, key=lambda x: x['focus_score'], reverse=True)[:5]
+        return heapq.nlargest(5, focus_scores, key=itemgetter('focus_score'))
     
     def _calculate_attention_quality_score(self, categories: Dict[str, int]) -> float:
         """Calculate overall attention quality score."""
@@ -1074,46 +1244,21 @@ class ModernAnalytics:
         
         total_sessions = sum(categories.values())
         if total_sessions > 0:
-            deep_focus_ratio = categories['deep_focus'] / total_sessions
-            if deep_focus_ratio < 0.2:
+            if categories['deep_focus'] / total_sessions < 0.2:
                 recommendations.append("🧘 Aim for more deep focus sessions (30+ minutes)")
-        
-        micro_focus_ratio = categories['micro_focus'] / total_sessions if total_sessions > 0 else 0
-        if micro_focus_ratio > 0.3:
-            recommendations.append("⚡ Too many very short sessions - try to minimize interruptions")
+            if categories['micro_focus'] / total_sessions > 0.3:
+                recommendations.append("⚡ Too many very short sessions - try to minimize interruptions")
         
         return recommendations
     
-    def _estimate_session_productivity(self, session: AppSession) -> float:
-        """Estimate productivity score for a session."""
-        base_score = 50  # Neutral baseline
-        
-        # Duration bonus (longer sessions generally more productive)
-        duration_minutes = session.duration_minutes if not session.is_active else (datetime.now() - session.start_time).total_seconds() / 60
-        if duration_minutes > 30:
-            base_score += 20
-        elif duration_minutes > 15:
-            base_score += 10
-        elif duration_minutes < 5:
-            base_score -= 20
-        
-        # Context switching penalty
-        context_penalty = len(session.context_changes) * 5
-        base_score -= context_penalty
-        
-        # Window switching penalty
-        window_penalty = (session.window_count - 1) * 2
-        base_score -= window_penalty
-        
-        # Status-based adjustment (if available)
-        if session.status_changes:
-            latest_status = session.status_changes[-1][1]
-            if latest_status == "Productive":
-                base_score += 30
-            elif latest_status == "Distracting":
-                base_score -= 30
-        
-        return max(0, min(100, base_score))
+    def _estimate_session_productivity(self, session: AppSession, now: Optional[datetime] = None) -> float:
+        """Estimate productivity score for a session; `now` measures an active session."""
+        duration_minutes = session.effective_duration_minutes(now)
+        latest_status = session.status_changes[-1][1] if session.status_changes else None
+        
+        return _score_session_productivity(
+            duration_minutes, len(session.context_changes), session.window_count, latest_status
+        )
     
     def _calculate_energy_consistency(self, energy_pattern: Dict[int, Dict]) -> float:
         """Calculate how consistent energy levels are throughout the day."""
@@ -1191,28 +1336,31 @@ class ModernAnalytics:
                 recommendations.append("🌙 Evening productivity - you might be a night owl")
         
         # Check for consistency
-        productive_hours = sum(1 for data in energy_pattern.values() if data['avg_productivity'] > 50)
+        productive_hours = sum(data['avg_productivity'] > 50 for data in energy_pattern.values())
         if productive_hours < 4:
             recommendations.append("⚡ Limited high-productivity hours - focus on optimizing your peak times")
         
         return recommendations
     
-    def _identify_workflow_patterns(self, transitions: List[Dict]) -> List[Dict[str, Any]]:
-        """Identify common workflow patterns from app transitions."""
-        # Look for sequences of 2-3 app transitions that repeat
-        pattern_counts = defaultdict(int)
+    def _identify_workflow_patterns(self, transitions: List[Dict], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Identify common workflow patterns from app transitions, most frequent first (top `limit` if given)."""
+        # Per-(from, to) transition time totals, gathered in one pass
+        pairs = [(t['from_app'], t['to_app']) for t in transitions]
+        pair_counts = Counter(pairs)
+        pair_time_sums = defaultdict(float)
+        for pair, t in zip(pairs, transitions):
+            pair_time_sums[pair] += t['transition_time']
         
-        for i in range(len(transitions) - 1):
-            pattern = (transitions[i]['from_app'], transitions[i]['to_app'], transitions[i+1]['to_app'])
-            pattern_counts[pattern] += 1
+        # Look for sequences of 2-3 app transitions that repeat
+        pattern_counts = Counter([
+            (pair[0], pair[1], next_pair[1]) for pair, next_pair in zip(pairs, pairs[1:])
+        ])
         
         common_patterns = []
         for pattern, count in pattern_counts.items():
             if count >= 2:  # Pattern appears at least twice
-                avg_transition_time = sum(
-                    t['transition_time'] for t in transitions 
-                    if t['from_app'] == pattern[0] and t['to_app'] == pattern[1]
-                ) / max(1, sum(1 for t in transitions if t['from_app'] == pattern[0] and t['to_app'] == pattern[1]))
+                pair = (pattern[0], pattern[1])
+                avg_transition_time = pair_time_sums[pair] / max(1, pair_counts[pair])
                 
                 common_patterns.append({
                     'pattern': ' → '.join(pattern),
@@ -1220,43 +1368,46 @@ class ModernAnalytics:
                     'avg_transition_time': round(avg_transition_time, 2)
                 })
         
-        return sorted(common_patterns, key=lambda x: x['frequency'], reverse=True)
+        if limit is not None:
+            return heapq.nlargest(limit, common_patterns, key=itemgetter('frequency'))
+        return sorted(common_patterns, key=itemgetter('frequency'), reverse=True)
     
     def _find_inefficient_patterns(self, transitions: List[Dict]) -> List[Dict[str, Any]]:
         """Find inefficient workflow patterns."""
         inefficient = []
         
-        # Find slow transitions
-        slow_transitions = [t for t in transitions if t['transition_time'] > 30]  # Over 30 seconds
-        
-        if slow_transitions:
-            slow_apps = defaultdict(list)
-            for t in slow_transitions:
-                slow_apps[f"{t['from_app']} → {t['to_app']}"].append(t['transition_time'])
-            
-            for transition, times in slow_apps.items():
-                if len(times) >= 2:  # Multiple slow transitions for same pattern
-                    inefficient.append({
-                        'pattern': transition,
-                        'avg_delay': round(sum(times) / len(times), 2),
-                        'occurrences': len(times),
-                        'type': 'slow_transition'
-                    })
+        # One pass: extract (from, to) pairs and group slow transitions (over 30 seconds) by pair
+        pairs = []
+        slow_groups = defaultdict(list)
+        for t in transitions:
+            pair = (t['from_app'], t['to_app'])
+            pairs.append(pair)
+            if t['transition_time'] > 30:
+                slow_groups[pair].append(t['transition_time'])
+        
+        for (from_app, to_app), times in slow_groups.items():
+            if len(times) >= 2:  # Multiple slow transitions for same pattern
+                inefficient.append({
+                    'pattern': f"{from_app} → {to_app}",
+                    'avg_delay': round(sum(times) / len(times), 2),
+                    'occurrences': len(times),
+                    'type': 'slow_transition'
+                })
         
         # Find back-and-forth patterns (indicating indecision or poor workflow)
-        for i in range(len(transitions) - 1):
-            if (transitions[i]['from_app'] == transitions[i+1]['to_app'] and 
-                transitions[i]['to_app'] == transitions[i+1]['from_app']):
+        for i, (pair, next_pair) in enumerate(zip(pairs, pairs[1:])):
+            if pair[0] == next_pair[1] and pair[1] == next_pair[0]:
                 inefficient.append({
-                    'pattern': f"{transitions[i]['from_app']} ↔ {transitions[i]['to_app']}",
+                    'pattern': f"{pair[0]} ↔ {pair[1]}",
                     'type': 'back_and_forth',
                     'time_wasted': transitions[i]['transition_time'] + transitions[i+1]['transition_time']
                 })
         
         return sorted(inefficient, key=lambda x: x.get('avg_delay', x.get('time_wasted', 0)), reverse=True)
     
-    def _generate_workflow_recommendations(self, transitions: List[Dict], inefficient_patterns: List[Dict]) -> List[str]:
-        """Generate workflow optimization recommendations."""
+    def _generate_workflow_recommendations(self, transitions: List[Dict], inefficient_patterns: List[Dict],
+                                           avg_transition: Optional[float] = None) -> List[str]:
+        """Generate workflow optimization recommendations; pass `avg_transition` if already computed."""
         recommendations = []
         
         if inefficient_patterns:
@@ -1268,22 +1419,9 @@ class ModernAnalytics:
             if back_forth:
                 recommendations.append("🔄 Reduce back-and-forth app switching - plan tasks in advance")
         
-        avg_transition = sum(t['transition_time'] for t in transitions) / len(transitions) if transitions else 0
+        if avg_transition is None:
+            avg_transition = fmean(t['transition_time'] for t in transitions) if transitions else 0
         if avg_transition > 10:
             recommendations.append("🎯 Consider batching similar tasks to reduce context switching")
         
         return recommendations
-
-# Helper function for numpy operations (simplified version)
-class np:
-    @staticmethod
-    def mean(data):
-        return sum(data) / len(data) if data else 0
-    
-    @staticmethod
-    def std(data):
-        if len(data) < 2:
-            return 0
-        mean_val = sum(data) / len(data)
-        variance = sum((x - mean_val) ** 2 for x in data) / len(data)
-        return variance ** 0.5
\ No newline at end of file
@@ -1,8 +1,73 @@
 # parser.py
-from models import WindowInfo
+import re
+from collections import OrderedDict
+from dataclasses import replace
+from functools import lru_cache
+from models import WindowInfo, ParsedTitle
 from category_classifier import CategoryClassifier
-from config_manager import ensure_process_mapped , processed_domain , PREFIXES , get_domain
+from config_manager import ensure_process_mapped , processed_domain , PREFIXES_SET , get_domain
 
+# Upper bound on memoized parse results; foreground titles repeat heavily between polls
+_PARSE_CACHE_SIZE = 1024
+
+# Title words are split on spaces only, as they always were; a word matches a prefix once
+# its edge whitespace is stripped, so only tabs etc. at the word's edges are allowed around it
+_WORD_PREFIXES = sorted(
+    (prefix for prefix in PREFIXES_SET if prefix and " " not in prefix and prefix == prefix.strip()),
+    key=len, reverse=True,
+)
+_PREFIX_RE = re.compile(
+    r"(?<![^ ])[^\S ]*(?:" + "|".join(map(re.escape, _WORD_PREFIXES)) + r")[^\S ]*(?![^ ])",
+    re.IGNORECASE,
+) if _WORD_PREFIXES else None
+# A whitespace run containing a space separates two words; it collapses to one space
+_WORD_GAP_RE = re.compile(r"\s* \s*")
+
+_SYSTEM_TYPES = frozenset({"system", "search"})
+
+# Display title builders indexed by (bool(context) << 1) | bool(app)
+_DISPLAY_TITLE_BUILDERS = (
+    lambda context, app: "Unknown Window",
+    lambda context, app: app,
+    lambda context, app: context,
+    lambda context, app: context + " - " + app,
+)
+
+
+def _split_dash(raw: str) -> tuple:
+    """Split a title on " - " into stripped, non-empty segments."""
+    return tuple(part for part in map(str.strip, raw.split(" - ")) if part)
+
+
+def _fill_single_part(parts: tuple, process_name: str, parsed_data: ParsedTitle):
+    """Just app name or document name."""
+    if 'ApplicationFrameHost' in process_name:
+        parsed_data.context = parts[0]
+        parsed_data.sub_app = parts[0]
+        parsed_data.app = parts[0]
+    else: 
+        mapped_name = ensure_process_mapped(process_name) if  process_name.endswith(".exe") else process_name
+        parsed_data.app = mapped_name
+        parsed_data.sub_app = mapped_name
+        parsed_data.context = parts[0]
+
+
+def _fill_two_parts(parts: tuple, process_name: str, parsed_data: ParsedTitle):
+    """Common format: "Document - Application"."""
+    parsed_data.context = parts[0]
+    parsed_data.sub_app = parts[0]
+    parsed_data.app = parts[1]
+
+
+def _fill_multi_part(parts: tuple, process_name: str, parsed_data: ParsedTitle):
+    """Multiple parts: "Context - SubApp - App"."""
+    parsed_data.context = " - ".join(parts[:-2])
+    parsed_data.sub_app = parts[-2]
+    parsed_data.app = parts[-1]
+
+
+# Part-count specific fillers for _parse_title_parts; anything else is multi-part
+_TITLE_PART_FILLERS = {1: _fill_single_part, 2: _fill_two_parts}
 
 
 class WindowTitleParser:
@@ -10,128 +75,118 @@ class WindowTitleParser:
 
     def __init__(self, classifier: CategoryClassifier):
         self.cat_classifier = classifier
+        self._cache = OrderedDict()
+        # Classification is a pure function of the strings while the rules stay loaded
+        self._classify = lru_cache(maxsize=512)(classifier.classify)
+        self._browser_classify = lru_cache(maxsize=512)(classifier.browser_classify)
 
-    def parse(self, raw_title: str, process_name: str, class_name: str) -> dict:
+    def clear_cache(self):
+        """Drop memoized parse and classification results, e.g. after the rules change."""
+        self._cache.clear()
+        self._classify.cache_clear()
+        self._browser_classify.cache_clear()
+
+    def parse(self, raw_title: str, process_name: str, class_name: str) -> ParsedTitle:
         """
-        Parses the window title and returns a dictionary of parsed components.
+        Parses the window title and returns its parsed components.
         
         Returns:
-            A dictionary with keys like 'app', 'context', 'display_title', and 'window_type'.
+            A ParsedTitle with fields like 'app', 'context', 'display_title', and 'window_type'.
         """
         # Get window type from classifier
-        window_type = self.cat_classifier.classify(raw_title, process_name, class_name)
+        window_type = self._classify(raw_title, process_name, class_name)
+        
+        # System and search windows need no title parsing, so skip the cache and handlers
+        if window_type in _SYSTEM_TYPES:
+            return ParsedTitle(
+                window_type=window_type,
+                app="System",
+                sub_app="System",
+                context=raw_title,
+                display_title=raw_title + " - System" if raw_title else "System",
+            )
+        
+        # Browser results also depend on the last visited domain, so it is part of the key
+        domain = get_domain() if window_type == "browser" else ""
+        cache_key = (raw_title, process_name, class_name, domain)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            self._cache.move_to_end(cache_key)
+            return replace(cached)
         
         # Initialize parsed data structure
-        parsed_data = {
-            "window_type": window_type,
-            "app": "",
-            "sub_app": "",
-            "context": raw_title,
-            "display_title": raw_title,
-            "original_app": "",
-            "domain": "",
-        }
+        parsed_data = ParsedTitle(
+            window_type=window_type,
+            context=raw_title,
+            display_title=raw_title,
+        )
         
         # Handle different window types
         if window_type == "file_manager":
             self._handle_file_manager(raw_title, parsed_data)
-        elif window_type in ["system", "search"]:
-            self._handle_system(raw_title, parsed_data)
         elif window_type == "browser":
             # parsed_data["original_app"] = parsed_data
             # print(f" orgins ,: {parsed_data['original_app']}")
-            url_app = processed_domain()
+            url_app = processed_domain(domain)
             # print("Urls: " , url_app )
             if url_app :
-                parsed_data["domain"] = get_domain()
-                raw_title = handle_raw_title(raw_title, process_name , url_app)
-                self._handle_browser(raw_title, process_name, parsed_data , url_app)
+                parsed_data.domain = domain
+                parts = handle_raw_title(_split_dash(raw_title), process_name , url_app)
+                self._handle_browser(raw_title, parts, process_name, parsed_data , url_app)
         else:
-            raw_title = process_raw_title(raw_title, process_name, parsed_data)
-            self._handle_generic(raw_title, process_name, parsed_data)
+            raw_title = process_raw_title(raw_title, process_name, class_name)
+            self._handle_generic(_split_dash(raw_title), process_name, parsed_data)
         
         # Create final display title
         self._create_display_title(parsed_data)
         
+        self._cache[cache_key] = replace(parsed_data)
+        if len(self._cache) > _PARSE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        
         return parsed_data
 
-    def _handle_file_manager(self, raw_title: str, parsed_data: dict):
+    def _handle_file_manager(self, raw_title: str, parsed_data: ParsedTitle):
         """Handle file manager windows."""
-        parsed_data['app'] = "File Explorer"
-        parsed_data['sub_app'] = "File Explorer"
+        parsed_data.app = "File Explorer"
+        parsed_data.sub_app = "File Explorer"
         
         # Extract path from title
         path_context = raw_title.replace("File Explorer", "").strip()
-        parsed_data['context'] = path_context
+        parsed_data.context = path_context
 
-    def _handle_system(self, raw_title: str, parsed_data: dict):
-        """Handle system and search windows."""
-        parsed_data['app'] = "System"
-        parsed_data['sub_app'] = "System"
-        parsed_data['context'] = raw_title
-
-    def _handle_browser(self, raw_title: str, process_name: str, parsed_data: dict , url_app: str):
+    def _handle_browser(self, raw_title: str, parts: tuple, process_name: str, parsed_data: ParsedTitle , url_app: str):
         """Handle browser windows."""
         # First parse the generic format
-        self._parse_title_parts(raw_title, process_name, parsed_data)
+        self._parse_title_parts(parts, process_name, parsed_data)
         
         # # Then adjust for browser-specific formatting
         if  url_app != "browser":
-            browser_sub_app = parsed_data["sub_app"]
-            parsed_data["sub_app"] = f"Browser ({parsed_data['app']})"
-            parsed_data["app"] = browser_sub_app
-            # print(f"window type before: {parsed_data['window_type']}")
-            parsed_data['window_type'] = self.cat_classifier.browser_classify(raw_title, parsed_data["window_type"], parsed_data["app"])
-            # print(f"window type after: {parsed_data['window_type']}")
-
-    def _handle_generic(self, raw_title: str, process_name: str, parsed_data: dict):
+            browser_sub_app = parsed_data.sub_app
+            parsed_data.sub_app = f"Browser ({parsed_data.app})"
+            parsed_data.app = browser_sub_app
+            # print(f"window type before: {parsed_data.window_type}")
+            parsed_data.window_type = self._browser_classify(raw_title, parsed_data.window_type, parsed_data.app)
+            # print(f"window type after: {parsed_data.window_type}")
+
+    def _handle_generic(self, parts: tuple, process_name: str, parsed_data: ParsedTitle):
         """Handle generic windows with standard formatting."""
-        self._parse_title_parts(raw_title, process_name, parsed_data)
+        self._parse_title_parts(parts, process_name, parsed_data)
 
-    def _parse_title_parts(self, raw_title: str, process_name: str, parsed_data: dict):
-        """Parse title parts in 'Context - App' format."""
-        parts = [part.strip() for part in raw_title.split(" - ") if part.strip()]
-        
-        if len(parts) == 1:
-            # Just app name or document name
-            if 'ApplicationFrameHost' in process_name:
-                parsed_data['context'] = parts[0]
-                parsed_data['sub_app'] = parts[0]
-                parsed_data['app'] = parts[0]
-            else: 
-                parsed_data['app'] = ensure_process_mapped(process_name) if  process_name.endswith(".exe") else process_name
-                parsed_data['sub_app'] = ensure_process_mapped(process_name) if  process_name.endswith(".exe") else process_name
-                parsed_data['context'] = parts[0]
-            
-        elif len(parts) == 2:
-            # Common format: "Document - Application"
-            parsed_data['context'] = parts[0]
-            parsed_data['sub_app'] = parts[0]
-            parsed_data['app'] = parts[1]
-            
-        else:
-            # Multiple parts: "Context - SubApp - App"
-            parsed_data['context'] = " - ".join(parts[:-2])
-            # print("context: ", parsed_data['context'])
-            parsed_data['sub_app'] = parts[-2]
-            parsed_data['app'] = parts[-1]
-            
-        parsed_data['original_app'] = parts[-1]
-        # print(parsed_data['original_app'])
-
-    def _create_display_title(self, parsed_data: dict):
+    def _parse_title_parts(self, parts: tuple, process_name: str, parsed_data: ParsedTitle):
+        """Parse pre-split title parts in 'Context - App' format."""
+        if not parts:
+            # e.g. a title made only of prefixes; keep the raw title as context
+            return
+        _TITLE_PART_FILLERS.get(len(parts), _fill_multi_part)(parts, process_name, parsed_data)
+        parsed_data.original_app = parts[-1]
+
+    def _create_display_title(self, parsed_data: ParsedTitle):
         """Create the final display title."""
-        context = parsed_data.get('context', '')
-        app = parsed_data.get('app', '')
-        
-        if context and app:
-            parsed_data['display_title'] = f"{context} - {app}"
-        elif context:
-            parsed_data['display_title'] = context
-        elif app:
-            parsed_data['display_title'] = app
-        else:
-            parsed_data['display_title'] = "Unknown Window"
+        context = parsed_data.context
+        app = parsed_data.app
+        flag = (bool(context) << 1) | bool(app)
+        parsed_data.display_title = _DISPLAY_TITLE_BUILDERS[flag](context, app)
 
 
 # def process_raw_title(raw_title, process_name, class_name):
@@ -146,6 +201,7 @@ class WindowTitleParser:
 #     PREFIXES
 #     return p_raw_title
 
+@lru_cache(maxsize=2048)
 def process_raw_title(raw_title, process_name, class_name):
     """Clean the raw title by removing specified prefixes from the last segment.
     
@@ -157,42 +213,47 @@ def process_raw_title(raw_title, process_name, class_name):
     Returns:
         str: The cleaned title with prefixes removed from the last segment
     """
-    # Split into main parts separated by " - "
-    parts = [part.strip() for part in raw_title.split(" - ") if part.strip()]
-    
-    if not parts:
-        return raw_title
-    
-    # Process the last part by splitting into words and removing prefixes
-    last_part = parts[-1]
-    sub_parts = [word.strip() for word in last_part.split(" ") if word.strip()]
-    cleaned_words = [word for word in sub_parts if word.lower() not in PREFIXES]
-    
-    # Rebuild the last part without prefixes
-    parts[-1] = " ".join(cleaned_words)
+    # Only the last non-empty segment is cleaned, so peel it off instead of splitting everything.
+    # Overlapping separators (" - - ") split differently from the right; those take the full split.
+    if " - - " in raw_title:
+        parts = _split_dash(raw_title)
+        head, sep, tail = " - ".join(parts[:-1]), " - " if len(parts) > 1 else "", parts[-1] if parts else ""
+    else:
+        head, sep, tail = raw_title.rpartition(" - ")
+        while sep and not tail.strip():
+            head, sep, tail = head.rpartition(" - ")
     
-    # Recombine all parts with " - " separator
-    return " - ".join(parts)
+    # Remove prefixes from the last part and collapse the whitespace they leave behind
+    if _PREFIX_RE is not None:
+        tail = _PREFIX_RE.sub("", tail)
+    return head + sep + _WORD_GAP_RE.sub(" ", tail).strip()
 
-def handle_raw_title(raw_title, process_name, url_app):
-    p_raw_title = raw_title
+@lru_cache(maxsize=2048)
+def handle_raw_title(parts, process_name, url_app):
+    """Rearrange split browser title parts into 'Context - Site - Browser' order.
     
+    Args:
+        parts (tuple): The title already split by _split_dash
+        process_name (str): The browser process name
+        url_app (str): The site name derived from the last visited domain
+    
+    Returns:
+        tuple: The rearranged title parts
+    """
     # If the url_app is browser, we don't need to process the title
     if url_app == "browser":
-        p_raw_title =  process_name
-    else:
-        parts = [part.strip() for part in p_raw_title.split(" - ") if part.strip()] 
-        if len(parts) == 2:
-            if parts[-2].lower() != url_app:
-                p_raw_title = parts[-2] + " - " + url_app.capitalize() + " - " + parts[-1]
-                
-        else:
-            if parts[-3].lower() == url_app:
-                # flip the last two parts
-                p_raw_title = parts[-2] + " - " + parts[-3] + " - " + parts[-1]
-            else:
-                # if not exits
-                p_raw_title = parts[-2] + " - " + url_app.capitalize() + " - " + parts[-1]
-                
-            
-    return p_raw_title
\ No newline at end of file
+        return _split_dash(process_name)
+    
+    if len(parts) < 2:
+        return parts
+    
+    if len(parts) == 2:
+        if parts[0].lower() != url_app:
+            return (parts[0], url_app.capitalize(), parts[1])
+        return parts
+    
+    if parts[-3].lower() == url_app:
+        # flip the last two parts
+        return (parts[-2], parts[-3], parts[-1])
+    # if not exits
+    return (parts[-2], url_app.capitalize(), parts[-1])
@@ -1,11 +1,46 @@
 # productivity_tracker.py
+import atexit
 import json
 import os
+import re
+import threading
 import requests
+from collections import OrderedDict
+from itertools import groupby
+from operator import itemgetter
 from typing import Dict, Optional, Literal
 from abc import ABC, abstractmethod
 from Providers.AIProvider import AIProvider , ProductivityCategory
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# Seconds to wait after an AI cache miss before writing, so bursts share one write
+_SAVE_DEBOUNCE_SECONDS = 2.0
+
+# Most AI classifications kept in memory and on disk; least recently used are evicted
+_AI_CACHE_SIZE = 4096
+
+
+def _compile_keywords(keywords) -> "re.Pattern":
+    """One alternation over the keywords, longest first so the longest keyword wins"""
+    return re.compile("|".join(re.escape(keyword) for keyword in sorted(keywords, key=len, reverse=True)))
+
+
+def _canon(name: str) -> str:
+    """Canonical lookup key: lowercase host without scheme, 'www.' or path"""
+    name = name.lower().removeprefix("https://").removeprefix("http://").removeprefix("www.")
+    return name.split("/", 1)[0]
+
 class ProductivityTracker:
     """
     A smart productivity classifier that:
@@ -30,7 +65,16 @@ class ProductivityTracker:
         self.config_path = config_path
         self.auto_save = auto_save
         self.ai_provider = ai_provider
+        self._save_lock = threading.Lock()
+        self._save_timer: Optional[threading.Timer] = None
+        self._dirty = False
+        # pyahocorasick raises if an automaton is updated while another thread iterates it
+        self._automaton_lock = threading.Lock()
         self.config = self._load_config()
+        self._load_ai_cache()
+        self._build_rule_matcher()
+        # The debounce timer is a daemon thread; flush pending AI results on exit
+        atexit.register(self.close)
 
     def _load_config(self) -> Dict:
         """Load config from JSON or create default"""
@@ -49,20 +93,164 @@ class ProductivityTracker:
             self._save_config(default_config)
             return default_config
 
-        with open(self.config_path, "r") as f:
-            config = json.load(f)
+        with open(self.config_path, "rb") as f:
+            data = f.read()
+            config = orjson.loads(data) if HAS_ORJSON else json.loads(data)
             
             # Merge with default to ensure all keys exist
             for key in default_config:
                 if key not in config:
                     config[key] = default_config[key]
             
+            # Older files stored raw names; lookups use canonical keys
+            config["user_overrides"] = {_canon(name): category for name, category in config["user_overrides"].items()}
+            
             return config
 
-    def _save_config(self, config: Optional[Dict] = None):
-        """Save config to JSON file"""
-        with open(self.config_path, "w") as f:
-            json.dump(config or self.config, f, indent=2)
+    def _save_config(self, config: Optional[Dict] = None, compact: bool = False):
+        """Save config to JSON file, replacing it atomically"""
+        tmp_path = f"{self.config_path}.tmp"
+        with self._save_lock:
+            if HAS_ORJSON:
+                with open(tmp_path, "wb") as f:
+                    f.write(orjson.dumps(config or self.config, option=0 if compact else orjson.OPT_INDENT_2))
+            else:
+                with open(tmp_path, "w") as f:
+                    if compact:
+                        json.dump(config or self.config, f, separators=(",", ":"))
+                    else:
+                        json.dump(config or self.config, f, indent=2)
+            os.replace(tmp_path, self.config_path)
+            self._dirty = False
+
+    def _schedule_save(self):
+        """Mark the config dirty and flush it once the current burst settles"""
+        with self._save_lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(_SAVE_DEBOUNCE_SECONDS, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+
+    def flush(self):
+        """Write pending changes (e.g. new AI cache entries) to disk"""
+        with self._save_lock:
+            self._save_timer = None
+            dirty = self._dirty
+        if dirty:
+            self._save_config(compact=True)
+
+    def close(self):
+        """Cancel any pending delayed save and flush immediately"""
+        with self._save_lock:
+            timer, self._save_timer = self._save_timer, None
+        if timer is not None:
+            timer.cancel()
+        self.flush()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def set_provider(self, ai_provider: Optional[AIProvider]):
+        """Swap the AI provider used for unknown resources"""
+        self.ai_provider = ai_provider
+
+    def reload_config(self):
+        """Re-read rules, overrides and the AI cache from disk"""
+        self.flush()
+        self.config = self._load_config()
+        self._load_ai_cache()
+        self._build_rule_matcher()
+
+    def _load_ai_cache(self):
+        """Turn the persisted AI cache into a bounded LRU (newest entries last)"""
+        entries = list(self.config["ai_cache"].items())[-_AI_CACHE_SIZE:]
+        self._ai_lru = OrderedDict((_canon(name), category) for name, category in entries)
+        self.config["ai_cache"] = self._ai_lru
+
+    def _build_rule_matcher(self):
+        """Compile the rule keywords so detect_status scans the name once"""
+        # Flatten to (keyword, priority, category) in rule order, longest keyword first per category
+        flat_rules = sorted(
+            (
+                (keyword.lower(), priority, category)
+                for priority, (category, keywords) in enumerate(self.config["rules"].items())
+                for keyword in keywords
+                if keyword
+            ),
+            key=lambda rule: (rule[1], -len(rule[0])),
+        )
+        # Inverse keyword -> category index; reversed so the earliest category wins
+        kw_to_cat = {keyword: category for keyword, _, category in reversed(flat_rules)}
+        automaton = None
+        patterns = []
+
+        if HAS_AHOCORASICK:
+            built = ahocorasick.Automaton()
+            for keyword, priority, category in flat_rules:
+                # A keyword listed twice belongs to the earlier category, as in dict order
+                if not built.exists(keyword):
+                    built.add_word(keyword, (priority, category))
+            if len(built):
+                built.make_automaton()
+                automaton = built
+        else:
+            # Fallback: one compiled alternation per category, tried in category order
+            for (_, category), group in groupby(flat_rules, key=itemgetter(1, 2)):
+                patterns.append((category, _compile_keywords(keyword for keyword, _, _ in group)))
+
+        # Published in one assignment: detect_status runs on other threads and must never
+        # see a half-built matcher (it would fall through to a paid AI lookup)
+        self._matcher = (kw_to_cat, automaton, patterns)
+
+    def _update_rule_matcher(self, keyword: str, category: str, changed_categories: set):
+        """Point one keyword at its new category without recompiling the other rules"""
+        kw_to_cat, automaton, patterns = self._matcher
+        if HAS_AHOCORASICK and automaton is None:
+            # No keywords existed before this one; there is nothing to update
+            self._build_rule_matcher()
+            return
+
+        kw_to_cat[keyword] = category
+        if automaton is not None:
+            priority = list(self.config["rules"]).index(category)
+            with self._automaton_lock:
+                automaton.add_word(keyword, (priority, category))
+                automaton.make_automaton()
+            return
+
+        # Fallback: recompile only the categories that gained or lost the keyword
+        compiled = dict(patterns)
+        self._matcher = (kw_to_cat, None, [
+            (
+                cat,
+                _compile_keywords(kw.lower() for kw in keywords if kw)
+                if cat in changed_categories or cat not in compiled else compiled[cat],
+            )
+            for cat, keywords in self.config["rules"].items()
+            if any(keywords)
+        ])
+
+    def _match_rules(self, resource_name: str) -> Optional[ProductivityCategory]:
+        """Return the first category (in rule order) with a keyword in resource_name"""
+        _, automaton, patterns = self._matcher
+        if automaton is not None:
+            best = None
+            with self._automaton_lock:
+                for _, (priority, category) in automaton.iter(resource_name):
+                    if best is None or priority < best[0]:
+                        best = (priority, category)
+                        if priority == 0:
+                            break
+            return best[1] if best else None
+
+        for category, pattern in patterns:
+            if pattern.search(resource_name):
+                return category
+        return None
 
     def detect_status(self, resource_name: str) -> ProductivityCategory:
         """
@@ -72,30 +260,35 @@ class ProductivityTracker:
         3. AI cache
         4. Fresh AI query (if enabled)
         """
-        resource_name = resource_name.lower()
+        resource_name = _canon(resource_name)
         
         # 1. Check user overrides (highest priority)
         override = self.config["user_overrides"].get(resource_name)
         if override:
             return override
 
-        # 2. Rule-based matching
-        for category, items in self.config["rules"].items():
-            if any(item in resource_name for item in items):
-                return category
+        # 2. Rule-based matching (an exact keyword match beats a substring match)
+        category = self._matcher[0].get(resource_name) or self._match_rules(resource_name)
+        if category:
+            return category
 
         # 3. Check AI cache
-        cached = self.config["ai_cache"].get(resource_name)
+        cached = self._ai_lru.get(resource_name)
         if cached:
+            with self._save_lock:
+                self._ai_lru.move_to_end(resource_name)
             return cached
 
         print(f"ai_provider: {self.ai_provider}")
         # 4. AI fallback
         if self.ai_provider:
             ai_response = self.ai_provider.classify(resource_name)
-            self.config["ai_cache"][resource_name] = ai_response
+            with self._save_lock:
+                self._ai_lru[resource_name] = ai_response
+                if len(self._ai_lru) > _AI_CACHE_SIZE:
+                    self._ai_lru.popitem(last=False)
             if self.auto_save:
-                self._save_config()
+                self._schedule_save()
             return ai_response
 
         return "Neutral"  # Default fallback
@@ -107,16 +300,20 @@ class ProductivityTracker:
         permanent: bool = True
     ):
         """Add a new rule or override"""
-        resource_name = resource_name.lower()
+        resource_name = _canon(resource_name)
+        changed_categories = {category}
 
-        # Remove from other categories first
-        for cat in self.config["rules"]:
-            if resource_name in self.config["rules"][cat]:
-                self.config["rules"][cat].remove(resource_name)
+        # Remove from every other category first; the index skips the scan for new keywords
+        if resource_name in self._matcher[0]:
+            for cat, keywords in self.config["rules"].items():
+                if cat != category and resource_name in keywords:
+                    keywords[:] = [keyword for keyword in keywords if keyword != resource_name]
+                    changed_categories.add(cat)
 
         # Add to specified category
         if resource_name not in self.config["rules"][category]:
             self.config["rules"][category].append(resource_name)
+        self._update_rule_matcher(resource_name, category, changed_categories)
 
         if permanent and self.auto_save:
             self._save_config()
@@ -128,7 +325,7 @@ class ProductivityTracker:
         permanent: bool = True
     ):
         """Manually correct a classification"""
-        self.config["user_overrides"][resource_name.lower()] = category
+        self.config["user_overrides"][_canon(resource_name)] = category
         if permanent and self.auto_save:
             self._save_config()
 
@@ -141,6 +338,7 @@ class ProductivityTracker:
         """Load rules from backup"""
         with open(file_path, "r") as f:
             self.config["rules"] = json.load(f)
+        self._build_rule_matcher()
         if self.auto_save:
             self._save_config()
 
@@ -1,13 +1,16 @@
 # tracker.py
 import os
-import pygetwindow as gw
+import ctypes
+from ctypes import wintypes
 import time
 import threading
 import logging
 import win32gui
 import win32process
+from dataclasses import replace
 from datetime import datetime
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 
 # Import our new modules
@@ -29,6 +32,23 @@ from Providers.InitAIProvider import AIProviderManager , ProviderType
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Per-tick diagnostics are debug-level; set FOCUSAI_VERBOSE=1 to see them
+_log = logging.getLogger(__name__)
+if os.environ.get("FOCUSAI_VERBOSE"):
+    _log.setLevel(logging.DEBUG)
+
+# WinEvent hook constants (winuser.h)
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+WM_QUIT = 0x0012
+PM_NOREMOVE = 0x0000
+
+_WinEventProc = ctypes.WINFUNCTYPE(
+    None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+    wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+)
+
 class WindowTracker:
     def __init__(self, interval: int = 1, session_gap_seconds: int = 30 ,
                 database_url: str = None):
@@ -53,8 +73,9 @@ class WindowTracker:
         self.provider = AIProviderManager()
         
         
-        if self.provider.load_provider():
-            self.ai_provider = self.provider.create_ai_provider(self.provider.load_provider()[0],self.provider.load_provider()[1])
+        provider_cfg = self.provider.load_provider()
+        if provider_cfg:
+            self.ai_provider = self.provider.create_ai_provider(provider_cfg[0], provider_cfg[1])
         else:
             self.ai_provider = None
             
@@ -65,134 +86,138 @@ class WindowTracker:
             ai_provider=self.ai_provider
         )
         self.tracking_thread: Optional[threading.Thread] = None
-
-    def _get_real_window_handle(self, pygetwindow_obj) -> Optional[int]:
-        """Get the real Windows handle (HWND) from pygetwindow object"""
-        try:
-            # Method 1: Try to get the handle directly if available
-            if hasattr(pygetwindow_obj, '_hWnd') and pygetwindow_obj._hWnd:
-                return pygetwindow_obj._hWnd
-            
-            # Method 2: Find window by title and process
-            title = pygetwindow_obj.title
-            if not title.strip():
-                return None
-                
-            def enum_windows_proc(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd):
-                    try:
-                        window_title = win32gui.GetWindowText(hwnd)
-                        if window_title == title:
-                            windows.append(hwnd)
-                    except:
-                        pass
-                return True
-            
-            windows = []
-            win32gui.EnumWindows(enum_windows_proc, windows)
-            
-            # If we found matching windows, return the first visible one
-            for hwnd in windows:
-                try:
-                    if win32gui.IsWindowVisible(hwnd) and not win32gui.GetParent(hwnd):
-                        return hwnd
-                except:
-                    continue
-            
-            # Method 3: Fallback - enumerate all windows and match by position/size
-            try:
-                target_rect = (pygetwindow_obj.left, pygetwindow_obj.top, 
-                              pygetwindow_obj.width, pygetwindow_obj.height)
-                
-                def enum_windows_proc2(hwnd, windows):
-                    try:
-                        if win32gui.IsWindowVisible(hwnd):
-                            rect = win32gui.GetWindowRect(hwnd)
-                            window_rect = (rect[0], rect[1], rect[2] - rect[0], rect[3] - rect[1])
-                            window_title = win32gui.GetWindowText(hwnd)
-                            
-                            # Match by title or position
-                            if (window_title == title or 
-                                (abs(window_rect[0] - target_rect[0]) < 5 and 
-                                 abs(window_rect[1] - target_rect[1]) < 5)):
-                                windows.append(hwnd)
-                    except:
-                        pass
-                    return True
-                
-                windows2 = []
-                win32gui.EnumWindows(enum_windows_proc2, windows2)
-                
-                if windows2:
-                    return windows2[0]
-                    
-            except:
-                pass
-                
-            return None
-            
-        except Exception as e:
-            logging.error(f"Error getting real window handle: {e}")
-            return None
+        
+        # Productivity status per app, resolved off the tracking thread (AI lookups can block)
+        self._status_cache: Dict[str, str] = {}
+        self._status_pending = set()
+        self._status_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="status")
+        # Bumped whenever queued/running lookups become stale (stop, config reload)
+        self._status_generation = 0
+        self._status_lock = threading.Lock()
+        
+        # Foreground-change hook: wakes the tracking loop as soon as the user switches windows
+        self.hook_thread: Optional[threading.Thread] = None
+        self._foreground_changed = threading.Event()
+        
+        # Last enriched window, reused while the foreground window and its title are unchanged
+        self._last_hwnd = 0
+        self._last_title = ""
+        self._last_info: Optional[WindowInfo] = None
+        # isoformat() of the current whole second, rebuilt once per second
+        self._ts_second = 0
+        self._ts_str = ""
 
     def _get_active_window_info(self) -> Optional[WindowInfo]:
         """Captures and enriches data for the currently active window."""
         try:
-            active_window = gw.getActiveWindow()
-            if not active_window or not active_window.title.strip():
+            hwnd = win32gui.GetForegroundWindow()
+            title = win32gui.GetWindowText(hwnd) if hwnd else ""
+            if not title.strip():
                 return None
 
-            timestamp = datetime.now().isoformat()
-            ext_info = utils.get_extended_window_info(active_window)
-            process_name = utils.get_process_name(active_window)
-            process = utils.get_process(active_window)
-            class_name = ext_info.get('class_name')
-            
-            # Get the real Windows handle
-            real_hwnd = self._get_real_window_handle(active_window)
-            if not real_hwnd:
-                # Fallback to a generated ID if we can't get the real handle
-                real_hwnd = hash((active_window.title, process_name, time.time())) & 0x7FFFFFFF
-                logging.warning(f"Could not get real HWND for window: {active_window.title}, using fallback ID: {real_hwnd}")
+            # Nothing changed since the last tick: only the timestamp moves on
+            if self._last_info is not None and hwnd == self._last_hwnd and title == self._last_title:
+                second = int(time.time())
+                if second != self._ts_second:
+                    self._ts_second = second
+                    self._ts_str = datetime.fromtimestamp(second).isoformat()
+                last_info = self._last_info
+                # Re-request the status while it is unresolved (e.g. the lookup was dropped
+                # by a worker reset or failed); once cached this stays a plain dict hit
+                status = self._status_cache.get(last_info.app) or self._get_status(last_info.app)
+                return replace(last_info, timestamp=self._ts_str, status=status)
+            
+            # A real focus change keeps full precision; later ticks in the same second
+            # reuse it rather than the whole second, which would step back in time
+            now = datetime.now()
+            timestamp = now.isoformat()
+            self._ts_second, self._ts_str = int(now.timestamp()), timestamp
+            
+            # Read the foreground window once; every field below comes from this snapshot
+            snapshot = utils.snapshot_window(hwnd, title)
+            if not snapshot:
+                return None
+            ext_info = snapshot['extended']
+            process_name = snapshot['process_name']
+            process = snapshot['process']
+            ext_get = ext_info.get
+            class_name = ext_get('class_name')
             
-            parsed_title_info = self.title_parser.parse(
-                active_window.title, process_name, class_name
-            )
+            pt = self.title_parser.parse(title, process_name, class_name)
             
-            status = self.Pr_classier.detect_status(parsed_title_info['app'])
-            print(f"Status: {status}")
+            status = self._get_status(pt.app)
             
-            return WindowInfo(
-                raw_title=active_window.title,
-                window_id=real_hwnd,  # Use real HWND instead of Python object ID
+            window_info = WindowInfo(
+                raw_title=title,
+                window_id=hwnd,  # Use real HWND instead of Python object ID
                 timestamp=timestamp,
-                position=(active_window.left, active_window.top),
-                size=(active_window.width, active_window.height),
-                is_active=active_window.isActive,
-                is_minimized=active_window.isMinimized,
-                is_maximized=active_window.isMaximized,
-                is_visible=active_window.visible,
+                position=snapshot['position'],
+                size=snapshot['size'],
+                is_active=True,  # the foreground window is the active one
+                is_minimized=snapshot['is_minimized'],
+                is_maximized=snapshot['is_maximized'],
+                is_visible=snapshot['is_visible'],
                 z_order=-1,  # Z-order is expensive, maybe calculate it only when needed
                 process_name=process_name,  # name for a file
                 process=process,  # .exe
                 class_name=class_name,
-                is_system_window=ext_info.get('is_tool_window', False) or ext_info.get('is_popup', False),
-                is_topmost=ext_info.get('is_topmost', False),
-                parent_window_exists=bool(ext_info.get('parent_hwnd')),
-                window_type=parsed_title_info['window_type'],
-                app=parsed_title_info['app'],
-                original_app=parsed_title_info['original_app'],
-                domain=parsed_title_info['domain'],
+                is_system_window=ext_get('is_tool_window', False) or ext_get('is_popup', False),
+                is_topmost=ext_get('is_topmost', False),
+                parent_window_exists=bool(ext_get('parent_hwnd')),
+                window_type=pt.window_type,
+                app=pt.app,
+                original_app=pt.original_app,
+                domain=pt.domain,
                 status=status,
-                context=parsed_title_info['context'],
-                display_title=parsed_title_info['display_title'],
+                context=pt.context,
+                display_title=pt.display_title,
                 extra_info=ext_info
             )
+            self._last_hwnd, self._last_title, self._last_info = hwnd, title, window_info
+            return window_info
 
         except Exception as e:
             logging.error(f"Error detecting active window: {e}")
             return None
 
+    def _get_status(self, app: str) -> str:
+        """Returns the cached status for an app, resolving unknown apps in the background."""
+        status = self._status_cache.get(app)
+        if status is not None:
+            return status
+        # Under the lock so _reset_status_worker can't shut the executor down mid-submit
+        with self._status_lock:
+            if app not in self._status_pending:
+                self._status_pending.add(app)
+                self._status_executor.submit(self._resolve_status, app, self._status_generation)
+        # Until resolved the app counts as Neutral, the WindowInfo default
+        return "Neutral"
+
+    def _reset_status_worker(self, clear_cache: bool = False):
+        """Replaces the status worker; lookups already queued or running are discarded."""
+        with self._status_lock:
+            self._status_generation += 1
+            self._status_pending.clear()
+            if clear_cache:
+                self._status_cache.clear()
+            old_executor = self._status_executor
+            self._status_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="status")
+        old_executor.shutdown(wait=False, cancel_futures=True)
+
+    def _resolve_status(self, app: str, generation: int):
+        """Runs detect_status on the status worker and stores the result unless it went stale."""
+        try:
+            status = self.Pr_classier.detect_status(app)
+        except Exception as e:
+            logging.error(f"Error detecting status for {app}: {e}")
+            status = None
+        with self._status_lock:
+            if generation != self._status_generation:
+                return
+            if status is not None:
+                self._status_cache[app] = status
+            self._status_pending.discard(app)
+
     def get_current_window(self) -> Optional[WindowInfo]:
         """Get the currently active window info"""
         # print("Getting current window info... **********************************************")
@@ -203,6 +228,8 @@ class WindowTracker:
         """The internal loop that runs on a separate thread."""
         logging.info("Window tracking started.")
         
+        # Samples run on fixed monotonic beats, so slow ticks don't push the schedule back
+        next_tick = time.monotonic() + self.interval
         while self.is_tracking:
             window_info = self._get_active_window_info()
 
@@ -211,12 +238,60 @@ class WindowTracker:
                 # Add to intelligent history manager
                 self.history.add_window_info(window_info)
                 # Optional: Log current app for debugging
-                logging.info(f"Active: {window_info.app} - {window_info.context} (HWND: {window_info.window_id})")
-            
-            time.sleep(self.interval)
+                if _log.isEnabledFor(logging.DEBUG):
+                    _log.debug("Active: %s - %s (HWND: %s)", window_info.app, window_info.context, window_info.window_id)
+            
+            # Sleep until the next beat, or until the foreground window changes
+            now = time.monotonic()
+            if now >= next_tick:
+                next_tick += self.interval
+                if next_tick <= now:  # fell more than a beat behind; resync instead of bursting
+                    next_tick = now + self.interval
+            while self._foreground_changed.wait(next_tick - now):
+                self._foreground_changed.clear()
+                if not self.is_tracking:
+                    break
+                now = time.monotonic()
+                # Analytics credits every record with a full interval, so there is one record
+                # per beat: the first focus change before a beat is sampled now and that beat
+                # is skipped (the phase is kept); further changes wait for the following beat
+                if next_tick - now <= self.interval:
+                    next_tick += self.interval
+                    break
         
         logging.info("Window tracking stopped.")
 
+    def _on_foreground_event(self, hook, event, hwnd, id_object, id_child, event_thread, event_time):
+        """WinEventProc for EVENT_SYSTEM_FOREGROUND; runs on the hook thread."""
+        self._foreground_changed.set()
+
+    def _foreground_hook_loop(self):
+        """Installs the foreground WinEvent hook and pumps messages until WM_QUIT."""
+        user32 = ctypes.windll.user32
+        # HWINEVENTHOOK is pointer-sized; the default c_int restype would truncate it on 64-bit
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.UnhookWinEvent.argtypes = (wintypes.HANDLE,)
+        msg = wintypes.MSG()
+        # Create this thread's message queue first, so stop()'s WM_QUIT to our native_id
+        # can't be lost; a stop() that posted before the queue existed is caught here
+        user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_NOREMOVE)
+        if not self.is_tracking:
+            return
+        callback = _WinEventProc(self._on_foreground_event)  # must outlive the hook
+        hook = user32.SetWinEventHook(
+            EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, 0, callback, 0, 0,
+            WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        )
+        if not hook:
+            logging.warning("Could not install foreground hook; falling back to interval sampling")
+            return
+        
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        
+        user32.UnhookWinEvent(hook)
+
     def start(self):
         """Starts the window tracking in a background thread."""
         if self.is_tracking:
@@ -228,24 +303,38 @@ class WindowTracker:
         
         self.tracking_thread = threading.Thread(target=self._track_loop, daemon=True)
         self.tracking_thread.start()
+        
+        self.hook_thread = threading.Thread(target=self._foreground_hook_loop, daemon=True)
+        self.hook_thread.start()
 
     def stop(self):
         """Stops the window tracking."""
         self.is_tracking = False
         self.capturer.stop()  # Stop image capturing
+        self.Pr_classier.close()  # Write out AI results still waiting on the save debounce
+        
+        # Wake the tracking loop and end the hook thread's message loop
+        self._foreground_changed.set()
+        hook_thread = self.hook_thread
+        if hook_thread is not None and hook_thread.is_alive():
+            ctypes.windll.user32.PostThreadMessageW(hook_thread.native_id, WM_QUIT, 0, 0)
+            hook_thread.join(timeout=2.0)
+            if hook_thread.is_alive():
+                logging.warning("Foreground hook thread did not stop gracefully")
+        self.hook_thread = None
+        
+        self._reset_status_worker()
         
         if self.tracking_thread:
             logging.info("Stop signal sent to tracking thread.")
 
     def get_expanded_history(self) -> List[WindowInfo]:
         """Safely returns a copy of the focus history."""
-        with self.lock:
-            return list(self.expanded_history) if hasattr(self, 'expanded_history') else []
+        return list(getattr(self, 'expanded_history', ()))
         
     def get_focus_history(self) -> List[WindowInfo]:
         """Safely returns a copy of the focus history."""
-        with self.lock:
-            return list(self.focus_history) if hasattr(self, 'focus_history') else []
+        return list(getattr(self, 'focus_history', ()))
     
     
     
@@ -280,51 +369,16 @@ class WindowTracker:
                 except Exception as e:
                     logging.warning(f"Could not save history during restart: {e}")
             
-            # 4. Reinitialize AI Provider (reload from config/env)
-            try:
-                if self.provider.load_provider():
-                    self.ai_provider = self.provider.create_ai_provider(self.provider.load_provider()[0], self.provider.load_provider()[1])
-                    logging.info("AI Provider reloaded successfully")
-                else:
-                    self.ai_provider = None
-                    logging.info("No AI Provider configuration found")
-            except Exception as e:
-                logging.error(f"Error reloading AI Provider: {e}")
-                self.ai_provider = None
-            
-            # 5. Reinitialize all components with fresh instances
-            
-            # Reinitialize mode controller
-            self.mode_controller = ModeController()
-            
-            # Reinitialize history with new mode controller
-            session_gap = getattr(self.history, 'session_gap_seconds', 30) if hasattr(self, 'history') else 30
-            self.history = WindowHistory(self, session_gap_seconds=session_gap, Mode_Controller=self.mode_controller)
-            
-            # Reinitialize analytics
-            self.analytics = SessionAnalytics(self.history)
+            # 4. Reload provider and config files into the existing components
+            self.reload_config_files()
             
-            # Reinitialize image capturer
-            self.capturer = ImageCapturer(interval=self.interval)
-            
-            # Reinitialize classifiers and parsers (to reload any config files)
-            self.cat_classifier = CategoryClassifier()
-            self.title_parser = WindowTitleParser(self.cat_classifier)
-            
-            # Reinitialize productivity tracker with new AI provider
-            self.Pr_classier = ProductivityTracker(ai_provider=self.ai_provider)
-            
-            # 6. Reset thread-related attributes
+            # 5. Reset thread-related attributes
             self.tracking_thread = None
             self.is_tracking = False
             
-            # 7. Force garbage collection to clean up old instances
-            import gc
-            gc.collect()
-            
             logging.info("Quick restart completed successfully")
             
-            # 8. Restart tracking if it was running before
+            # 6. Restart tracking if it was running before
             if was_tracking:
                 logging.info("Restarting tracking...")
                 self.start()
@@ -345,32 +399,31 @@ class WindowTracker:
             logging.info("Reloading configuration files...")
             
             # Reload AI provider settings
-            if self.provider.load_provider():
-                old_provider = self.ai_provider
-                self.ai_provider = self.provider.create_ai_provider(self.provider.load_provider()[0], self.provider.load_provider()[1])
-                logging.info("AI Provider configuration reloaded")
-            
-            # Reload category classifier (if it has config files)
-            if hasattr(self.cat_classifier, 'reload_config'):
-                self.cat_classifier.reload_config()
-            else:
-                # Reinitialize if no reload method exists
-                self.cat_classifier = CategoryClassifier()
+            try:
+                provider_cfg = self.provider.load_provider()
+                if provider_cfg:
+                    self.ai_provider = self.provider.create_ai_provider(provider_cfg[0], provider_cfg[1])
+                    logging.info("AI Provider configuration reloaded")
+                else:
+                    self.ai_provider = None
+                    logging.info("No AI Provider configuration found")
+            except Exception as e:
+                logging.error(f"Error reloading AI Provider: {e}")
+                self.ai_provider = None
             
-            # Reload title parser
-            self.title_parser = WindowTitleParser(self.cat_classifier)
+            # Reload category patterns; cached parses depend on them
+            self.cat_classifier.reload_config()
+            self.title_parser.clear_cache()
             
-            # Reload productivity tracker with new AI provider
-            self.Pr_classier = ProductivityTracker(ai_provider=self.ai_provider)
+            # Reload productivity rules and hand over the new AI provider
+            self.Pr_classier.set_provider(self.ai_provider)
+            self.Pr_classier.reload_config()
+            # Lookups started under the old provider/rules must not refill the cache
+            self._reset_status_worker(clear_cache=True)
+            self._last_info = None
             
             # Reload mode controller settings
-            if hasattr(self.mode_controller, 'reload_config'):
-                self.mode_controller.reload_config()
-            else:
-                self.mode_controller = ModeController()
-                # Update history's mode controller reference
-                if hasattr(self.history, 'Mode_Controller'):
-                    self.history.Mode_Controller = self.mode_controller
+            self.mode_controller.reload_config()
             
             logging.info("Configuration files reloaded successfully")
             
@@ -395,7 +448,7 @@ class WindowTracker:
                 'title_parser': hasattr(self, 'title_parser') and self.title_parser is not None,
                 'productivity_classifier': hasattr(self, 'Pr_classier') and self.Pr_classier is not None,
             },
-            'provider_info': self.provider.load_provider() if self.provider.load_provider() else None
+            'provider_info': self.provider.load_provider() or None
         }
         
     def _setup_database(self, database_url: str):
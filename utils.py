@@ -2,7 +2,7 @@
 import platform
 import logging
 import psutil
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
 # Import the loaded map from the single config source
 from config_manager import PROCESS_NAME_MAP
@@ -15,7 +15,79 @@ try:
 except ImportError:
     IS_WINDOWS = False
 
+# WINDOWPLACEMENT.showCmd values that mean the window is minimized
+_MINIMIZED_SHOW_CMDS = (
+    frozenset({win32con.SW_SHOWMINIMIZED, win32con.SW_MINIMIZE, win32con.SW_SHOWMINNOACTIVE})
+    if IS_WINDOWS else frozenset()
+)
 
+# HWND -> ((thread_id, pid), class_name, styles). Every read re-checks the window's
+# owning thread and process, one cheap call that catches a recycled HWND or PID
+_HWND_CACHE_SIZE = 512
+_hwnd_cache: Dict[int, Tuple[Tuple[int, int], str, Tuple[int, int, bool, bool, bool]]] = {}
+
+# (pid, create_time) -> (friendly_name, exe_name); the start time keeps a recycled
+# PID from inheriting the names of the process that used it before
+_process_cache: Dict[Tuple[int, float], Tuple[str, str]] = {}
+
+
+def _window_record(hwnd: int):
+    """Returns ((thread_id, pid), class_name, styles) for a window, re-reading it if the HWND was reused.
+    
+    styles is (style, extended_style, is_tool_window, is_popup, is_topmost); they
+    rarely change after creation, so they are read once per window.
+    """
+    identity = tuple(win32process.GetWindowThreadProcessId(hwnd))
+    record = _hwnd_cache.get(hwnd)
+    if record is None or record[0] != identity:
+        style = win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE)
+        ex_style = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
+        styles = (
+            style,
+            ex_style,
+            bool(ex_style & win32con.WS_EX_TOOLWINDOW),
+            bool(style & win32con.WS_POPUP),
+            bool(ex_style & win32con.WS_EX_TOPMOST),
+        )
+        record = (identity, win32gui.GetClassName(hwnd), styles)
+        if len(_hwnd_cache) >= _HWND_CACHE_SIZE:
+            _prune_dead_windows()
+        _hwnd_cache[hwnd] = record
+    return record
+
+
+def _hwnd_info(hwnd: int) -> Tuple[int, str]:
+    """Returns (pid, class_name) for a window."""
+    (_, pid), class_name, _ = _window_record(hwnd)
+    return pid, class_name
+
+
+def _prune_dead_windows():
+    """Drops entries for HWNDs that no longer exist, clearing the cache if it is still full."""
+    for cached_hwnd in list(_hwnd_cache):
+        if not win32gui.IsWindow(cached_hwnd):
+            _hwnd_cache.pop(cached_hwnd, None)
+    if len(_hwnd_cache) >= _HWND_CACHE_SIZE:
+        _hwnd_cache.clear()
+
+
+def _pid_to_names(pid: int) -> Tuple[str, str]:
+    """Returns (friendly_name, exe_name) for a process id."""
+    process = psutil.Process(pid)
+    key = (pid, process.create_time())
+    names = _process_cache.get(key)
+    if names is None:
+        exe_name = process.name()
+        names = (PROCESS_NAME_MAP.get(exe_name, exe_name), exe_name)
+        if len(_process_cache) >= _HWND_CACHE_SIZE:
+            _process_cache.clear()
+        _process_cache[key] = names
+    return names
+
+
+def forget_window(hwnd: int):
+    """Drops cached data for a window whose process has gone away."""
+    _hwnd_cache.pop(hwnd, None)
 
 
 def get_process_name(window_obj) -> str | None:
@@ -23,13 +95,14 @@ def get_process_name(window_obj) -> str | None:
     if not IS_WINDOWS or not hasattr(window_obj, '_hWnd'):
         return None
     try:
-        _, pid = win32process.GetWindowThreadProcessId(window_obj._hWnd)
-        process = psutil.Process(pid)
-        # The line below is the only change in this function!
-        # print(process.name())
+        pid, _ = _hwnd_info(window_obj._hWnd)
         # It now uses the map we loaded from JSON.
-        return PROCESS_NAME_MAP.get(process.name(), process.name())
-    except (psutil.NoSuchProcess, psutil.AccessDenied, Exception) as e:
+        return _pid_to_names(pid)[0]
+    except psutil.NoSuchProcess as e:
+        forget_window(window_obj._hWnd)
+        logging.warning(f"Could not get process name for window '{window_obj.title}': {e}")
+        return None
+    except (psutil.AccessDenied, Exception) as e:
         logging.warning(f"Could not get process name for window '{window_obj.title}': {e}")
         return None
     
@@ -38,38 +111,78 @@ def get_process(window_obj) -> str | None:
     if not IS_WINDOWS or not hasattr(window_obj, '_hWnd'):
         return None
     try:
-        _, pid = win32process.GetWindowThreadProcessId(window_obj._hWnd)
-        process = psutil.Process(pid)
-        # The line below is the only change in this function!
-        # print(process.name())
-        # It now uses the map we loaded from JSON.
-        return process.name()
-    except (psutil.NoSuchProcess, psutil.AccessDenied, Exception) as e:
+        pid, _ = _hwnd_info(window_obj._hWnd)
+        return _pid_to_names(pid)[1]
+    except psutil.NoSuchProcess as e:
+        forget_window(window_obj._hWnd)
+        logging.warning(f"Could not get process for window '{window_obj.title}': {e}")
+        return None
+    except (psutil.AccessDenied, Exception) as e:
         logging.warning(f"Could not get process for window '{window_obj.title}': {e}")
         return None
 
 def get_extended_window_info(window_obj) -> Dict:
-    """Gets extended, Windows-specific information (styles, parent, etc.)."""
-    if not IS_WINDOWS or not hasattr(window_obj, '_hWnd'):
+    """Gets extended, Windows-specific information (styles, parent, etc.).
+    
+    Accepts either a window object exposing `_hWnd` or a raw HWND.
+    """
+    hwnd = window_obj if isinstance(window_obj, int) else getattr(window_obj, '_hWnd', None)
+    if not IS_WINDOWS or not hwnd:
         return {}
         
     info = {}
     try:
-        hwnd = window_obj._hWnd
-        info['class_name'] = win32gui.GetClassName(hwnd)
+        _, info['class_name'], styles = _window_record(hwnd)
         info['parent_hwnd'] = win32gui.GetParent(hwnd)
-        info['window_style'] = win32gui.GetWindowLong(hwnd, win32con.GWL_STYLE)
-        info['extended_style'] = win32gui.GetWindowLong(hwnd, win32con.GWL_EXSTYLE)
-        
-        # Derived boolean flags for easier use
-        info['is_tool_window'] = bool(info['extended_style'] & win32con.WS_EX_TOOLWINDOW)
-        info['is_popup'] = bool(info['window_style'] & win32con.WS_POPUP)
-        info['is_topmost'] = bool(info['extended_style'] & win32con.WS_EX_TOPMOST)
+        # Style longs plus derived boolean flags for easier use
+        (
+            info['window_style'],
+            info['extended_style'],
+            info['is_tool_window'],
+            info['is_popup'],
+            info['is_topmost'],
+        ) = styles
 
     except Exception as e:
-        logging.warning(f"Could not get extended info for window '{window_obj.title}': {e}")
+        logging.warning(f"Could not get extended info for window {hwnd}: {e}")
 
     return info
 
+def snapshot_window(hwnd: int, title: Optional[str] = None) -> Dict:
+    """Reads everything the tracker needs about a window, issuing each Win32 call once.
+    
+    Pass `title` if the caller already read it. Returns an empty dict if the
+    window cannot be read (e.g. it closed mid-tick).
+    """
+    if not IS_WINDOWS or not hwnd:
+        return {}
+    try:
+        if title is None:
+            title = win32gui.GetWindowText(hwnd)
+        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+        show_cmd = win32gui.GetWindowPlacement(hwnd)[1]
+        snapshot = {
+            'hwnd': hwnd,
+            'title': title,
+            'position': (left, top),
+            'size': (right - left, bottom - top),
+            'is_minimized': show_cmd in _MINIMIZED_SHOW_CMDS,
+            'is_maximized': show_cmd == win32con.SW_SHOWMAXIMIZED,
+            'is_visible': bool(win32gui.IsWindowVisible(hwnd)),
+            'extended': get_extended_window_info(hwnd),
+        }
+    except Exception as e:
+        logging.warning(f"Could not snapshot window {hwnd}: {e}")
+        return {}
 
-
+    try:
+        pid, _ = _hwnd_info(hwnd)
+        snapshot['process_name'], snapshot['process'] = _pid_to_names(pid)
+    except psutil.NoSuchProcess as e:
+        forget_window(hwnd)
+        logging.warning(f"Could not get process for window '{title}': {e}")
+        snapshot['process_name'] = snapshot['process'] = None
+    except (psutil.AccessDenied, Exception) as e:
+        logging.warning(f"Could not get process for window '{title}': {e}")
+        snapshot['process_name'] = snapshot['process'] = None
+    return snapshot